@@ -0,0 +1,91 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "/tmp/llm_responses.db")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 2048))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+PURGE_INTERVAL = 256
+
+
+def cache_key(*parts:str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """
+    Response cache for the inference endpoints: an LRU in front of a SQLite file.
+
+    Keys hash (model, method, prompt version, inputs). On Cloud Run the SQLite
+    file lives on the instance's in-memory disk, so it lasts as long as the
+    instance and is bounded by the TTL purge.
+    """
+    def __init__(self, path:str=LLM_CACHE_PATH, max_size:int=LLM_CACHE_SIZE, ttl:int=LLM_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.counts = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses (key TEXT PRIMARY KEY, method TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, method:str, model:str, prompt_version:str, *inputs:str) -> str | None:
+        key = cache_key(model, method, prompt_version, *inputs)
+        with self._lock:
+            entry = self.memory.get(key)
+            outcome = "memory_hits"
+            if entry is None:
+                entry = self._conn.execute("SELECT created_at, value FROM llm_responses WHERE key = ?", (key,)).fetchone()
+                outcome = "disk_hits"
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self._count(method, "misses")
+                return None
+            self._remember(key, tuple(entry))
+            self._count(method, outcome)
+            return entry[1]
+
+    def put(self, method:str, model:str, prompt_version:str, *inputs:str, value:str):
+        key = cache_key(model, method, prompt_version, *inputs)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, (created_at, value))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, method, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, method, value, created_at),
+            )
+            self._writes += 1
+            if self._writes % PURGE_INTERVAL == 0:
+                self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (created_at - self.ttl,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            methods = {}
+            for method, counts in self.counts.items():
+                lookups = sum(counts.values())
+                methods[method] = {**counts, "hit_rate": (lookups - counts["misses"]) / lookups if lookups else 0.0}
+            return {"methods": methods, "memory_entries": len(self.memory)}
+
+    def _remember(self, key:str, entry:tuple):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def _count(self, method:str, outcome:str):
+        counts = self.counts.setdefault(method, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        counts[outcome] += 1
@@ -6,6 +6,7 @@ from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
 from google import genai
 from vertexai.generative_models import GenerativeModel, Part
+from llm_cache import LLMCache
 
 load_dotenv()
 
@@ -13,14 +14,30 @@ _project_id = os.getenv("PROJECT_ID")
 _location = os.getenv("LOCATION")
 _model = os.getenv("MODEL_NAME")
 
+# Part of every cache key: bump one whenever its prompt changes
+SUMMARIZE_VIDEO_PROMPT_VERSION = "1"
+GENERATE_QUIZ_PROMPT_VERSION = "1"
+GENERATE_SUMMARY_PROMPT_VERSION = "1"
+
 class VertexAI:
     def __init__(self):
         vertexai.init(project=_project_id, location=_location)
         self.model = GenerativeModel(_model)
+        self.cache = LLMCache()
         self.router = APIRouter()
         self.router.add_api_route("/summarize_video", self.summarize_video, methods=["POST"])
         self.router.add_api_route("/generate_quiz", self.generate_quiz, methods=["POST"])
         self.router.add_api_route("/generate_summary", self.generate_summary, methods=["POST"])
+        self.router.add_api_route("/cache_stats", self.cache_stats, methods=["GET"])
+
+    def _cached_generate(self, method: str, prompt_version: str, contents, *inputs: str) -> str:
+        cached = self.cache.get(method, _model, prompt_version, *inputs)
+        if cached is not None:
+            return cached
+        response = self.model.generate_content(contents)
+        if response.text:
+            self.cache.put(method, _model, prompt_version, *inputs, value=response.text)
+        return response.text
 
     async def summarize_video(self, video_link: str) -> dict:
         try:
@@ -28,26 +45,26 @@ class VertexAI:
                 "Summarize this video.",
                 Part.from_uri(video_link, "video/mp4"),
             ]
-            response = self.model.generate_content(contents)
-            return {"summary": response.text}
+            return {"summary": self._cached_generate("summarize_video", SUMMARIZE_VIDEO_PROMPT_VERSION, contents, video_link)}
         except Exception as e:
             return {"error": str(e)}
 
     async def generate_quiz(self, text: str) -> dict:
         try:
             prompt = f"Generate a quiz with 10 questions based on the following text: {text}"
-            response = self.model.generate_content(prompt)
-            return {"quiz": response.text}
+            return {"quiz": self._cached_generate("generate_quiz", GENERATE_QUIZ_PROMPT_VERSION, prompt, text)}
         except Exception as e:
             return {"error": str(e)}
 
     async def generate_summary(self, text: str) -> dict:
         try:
             prompt = f"Summarize the following class notes into concise bullet points: {text}"
-            response = self.model.generate_content(prompt)
-            return {"summary": response.text}
+            return {"summary": self._cached_generate("generate_summary", GENERATE_SUMMARY_PROMPT_VERSION, prompt, text)}
         except Exception as e:
             return {"error": str(e)}
+
+    async def cache_stats(self) -> dict:
+        return self.cache.stats()
     
 
 app = FastAPI()
@@ -11,5 +11,9 @@ fi
 
 source venv/bin/activate
 pip3 install -r src/backend/requirements.txt
+# Create any missing database tables
+python3 -m src.backend.services.migrate
+# Pre-transcode overlay clips to the render resolution
+python3 -m src.backend.services.overlay_library
 # Run your app
 fastapi dev src/backend/main.py
\ No newline at end of file
@@ -1,72 +1,72 @@
 import random
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, aclosing
 from dotenv import load_dotenv
 import uvicorn
-import requests
 load_dotenv()
 
 from fastapi import FastAPI, Request, Form, File, UploadFile, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
-from src.backend.services.ocr_mistral import extract_text_from_file
 from src.backend.services.gemini_client import Gemini, GeminiModel, GeminiEmbeddingModel
 from src.backend.services.cohere_client import Cohere
-from src.backend.services.models import Base, Material, Material_Metadata, Course, Video_Metadata, Video_Transcript, Questions, Users
+from src.backend.services.lazy import Lazy
+from src.backend.services.database import SessionLocal, get_db, session_scope, pool_stats
+from src.backend.services.pagination import keyset_page, InvalidCursorError, DEFAULT_PAGE_SIZE
+from src.backend.services.models import Material, Material_Metadata, Course, Video_Metadata, Video_Transcript, Questions, Users, Ingestion_Job
 from src.backend.services.youtube import Youtube
+from src.backend.services.youtube_search import QuotaExceededError, quota_tracker, search_cache
+from src.backend.services.vector_index import VectorIndexRegistry
+from src.backend.services.material_ingest import document_text
+from src.backend.services.embedding_cache import get_embedding_cache
+from src.backend.services.llm_cache import get_llm_cache
+from src.backend.services.ocr_cache import get_ocr_cache
+from src.backend.services.ocr_mistral import page_source_stats
+from src.backend.services.transcript_store import get_transcript_store
+from src.backend.services.gateway_client import GatewayClient
+from src.backend.services.ingestion import IngestionWorker, IngestionQueue, save_upload, create_job, job_status
+from src.backend.services.render_engine import get_render_pool, shutdown_render_pool
 from fastapi.exceptions import HTTPException
 from typing import Annotated, Optional
-import tempfile
-import shutil
 # SQLAlchemy imports
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer
 import uuid
 from supabase import create_client, Client
 from datetime import datetime
 
-# Create SQLAlchemy engine and session
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT", 6543)  # Default to 6543 if not specified
-DB_NAME = os.getenv("DB_NAME")
 GCP_GATEWAY = os.getenv("GCP_GATEWAY")
 
-# Create the connection URL
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
-Base.metadata.reflect(bind=engine)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Check if tables exist before creating them
-inspector = inspect(engine)
-tables_to_check = [
-    'materials',
-    'material_metadata',
-    'video_metadata',
-    'video_transcript',
-    'questions',
-    'courses',
-    'users'
-]
-
-tables_missing = [table for table in tables_to_check if not inspector.has_table(table)]
-
-if tables_missing:
-    print(f"Creating missing tables: {', '.join(tables_missing)}")
-    Base.metadata.create_all(bind=engine)
-else:
-    print("All database tables already exist, skipping creation.")
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-app = FastAPI()
-gemini = Gemini(os.getenv('GEMINI_API_KEY'), GeminiModel.FLASH, GeminiEmbeddingModel.EMBEDDING)
-co_client = Cohere(os.getenv('COHERE_API_KEY'))
+# Missing tables are created by the migration step (python -m src.backend.services.migrate), not on import
+WARM_CLIENTS_ON_STARTUP = os.getenv("WARM_CLIENTS_ON_STARTUP", "true").lower() == "true"
+
+gateway = GatewayClient(GCP_GATEWAY)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await gateway.start()
+    await ingestion_queue.start()
+    # Started here, on the event loop thread, rather than lazily from a video_executor thread
+    get_render_pool()
+    warm_up = None
+    if WARM_CLIENTS_ON_STARTUP:
+        # Built in the background so the server accepts requests immediately;
+        # a request that needs a client before then waits for its build.
+        warm_up = asyncio.gather(asyncio.to_thread(gemini.warm), asyncio.to_thread(co_client.warm))
+    yield
+    if warm_up is not None:
+        await warm_up
+    await ingestion_queue.stop()
+    await asyncio.to_thread(shutdown_render_pool)
+    await gateway.close()
+
+app = FastAPI(lifespan=lifespan)
+gemini = Lazy(lambda: Gemini(os.getenv('GEMINI_API_KEY'), GeminiModel.FLASH, GeminiEmbeddingModel.EMBEDDING), "Gemini")
+co_client = Lazy(lambda: Cohere(os.getenv('COHERE_API_KEY')), "Cohere")
+vector_indexes = VectorIndexRegistry()
+# yt-dlp downloads and ffmpeg renders are subprocess-bound, so threads overlap them well
+video_executor = ThreadPoolExecutor(max_workers=int(os.getenv("VIDEO_WORKERS", 4)))
 
 app.add_middleware(
     CORSMiddleware,
@@ -76,9 +76,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_signed_url(filename: str) -> str:
+async def get_signed_url(filename: str) -> str:
     # First request to get the signed URL
-    url = f"{GCP_GATEWAY}/v1/cloudstore/storage-post"
+    url = "/v1/cloudstore/storage-post"
     
     # Prepare the JSON payload
     payload = {
@@ -86,7 +86,7 @@ def get_signed_url(filename: str) -> str:
     }
     
     # Make the POST request
-    response = requests.post(
+    response = await gateway.post(
         url,
         headers={"Content-Type": "application/json"},
         json=payload
@@ -98,18 +98,37 @@ def get_signed_url(filename: str) -> str:
     else:
         raise Exception(f"Failed to get signed URL: {response.text}")
 
+ingestion_queue = IngestionQueue(IngestionWorker(SessionLocal, gemini, co_client, get_signed_url, vector_indexes))
+
 @app.get("/")
 def root():
     return {"message": "Athena backend is running"}
 
+@app.get("/cache-stats")
+def cache_stats():
+    return {
+        "embeddings": get_embedding_cache().stats(),
+        "ocr": get_ocr_cache().stats(),
+        "ocr_page_sources": page_source_stats(),
+        "transcripts": get_transcript_store().stats(),
+        "youtube_search": search_cache.stats(),
+        "youtube_quota": quota_tracker.stats(),
+        "llm": get_llm_cache().stats(),
+        "vector_indexes": vector_indexes.stats(),
+    }
+
+@app.get("/db-pool-stats")
+def db_pool_stats():
+    return pool_stats()
+
 @app.post("/summarize")
 async def summarize(notes: str = Form(...), video_link: str = Form(None)):
     if not notes and not video_link:
         raise HTTPException(status_code=400, detail="Either notes or video_link must be provided")
     if notes:
         # Call the external API for video summarization
-        response = requests.post(
-            f"{GCP_GATEWAY}/v1/vertexai/generate_summary",
+        response = await gateway.post(
+            "/v1/vertexai/generate_summary",
             params={"text": notes}
         )
 
@@ -119,8 +138,8 @@ async def summarize(notes: str = Form(...), video_link: str = Form(None)):
             return {"error": f"External API error: {response.status_code}", "message": response.text}
     if video_link:
         # Call the external API for video summarization
-        response = requests.post(
-            f"{GCP_GATEWAY}/v1/vertexai/summarize_video",
+        response = await gateway.post(
+            "/v1/vertexai/summarize_video",
             params={"video_link": video_link}
         )
         
@@ -134,76 +153,107 @@ async def summarize(notes: str = Form(...), video_link: str = Form(None)):
         return {"summary": summary}
 
 @app.post("/get-video")
-async def get_video(user_id:Annotated[str, Form(...)]):
-    videos = get_db().query(Video_Metadata).filter(
-        Video_Metadata.user_id == user_id
-    ).all()
-    return {"videos": videos}
+def get_video(
+    user_id: Annotated[str, Form(...)],
+    cursor: Annotated[Optional[str], Form()] = None,
+    limit: Annotated[int, Form()] = DEFAULT_PAGE_SIZE,
+    include_summary: Annotated[bool, Form()] = False,
+    db: Session = Depends(get_db)
+):
+    columns = [Video_Metadata.id, Video_Metadata.video_id, Video_Metadata.length, Video_Metadata.video_url, Video_Metadata.created_at]
+    if include_summary:
+        columns.append(Video_Metadata.video_summary)
+    try:
+        videos, next_cursor = keyset_page(db, Video_Metadata, columns, [Video_Metadata.user_id == user_id], cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"videos": videos, "next_cursor": next_cursor}
 
 
 @app.post("/delete-note")
-async def delete_note(user_id:Annotated[str, Form(...)], doc_id:Annotated[str, Form(...)]):
-    get_db().query(Video_Metadata).filter(
+def delete_note(user_id:Annotated[str, Form(...)], doc_id:Annotated[str, Form(...)], db: Session = Depends(get_db)):
+    db.query(Video_Metadata).filter(
         Video_Metadata.id == doc_id
     ).delete()
-    get_db().commit()
+    db.commit()
+    vector_indexes.evict(user_id)
     return {"message": "Note deleted"}
 
 
+def process_video(youtube: Youtube, video_id: str, user_id: str) -> str | None:
+    """Transcript, section selection, render and DB insert for one video; runs on video_executor"""
+    try:
+        print(f"\nProcessing video {video_id}...")
+
+        transcript = youtube.download_youtube_transcript(video_id)
+        if not transcript:
+            print(f"No transcript available for video {video_id}")
+            return None
+
+        chunk_path, output_path, subtitles_file, video_length = youtube.process_transcript_alternative(video_id, gemini, transcript)
+        if not os.path.exists(output_path):
+            print(f"Failed to create output video at {output_path}")
+            return None
+
+        video_metadata = Video_Metadata(
+            video_id=video_id,
+            video_summary="",
+            length=video_length,
+            user_id=user_id,
+        )
+
+        with session_scope() as db:
+            db.add(video_metadata)
+            db.commit()
+        return video_id
+
+    except Exception as e:
+        print(f"Error processing video {video_id}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
 @app.post('/generate-video')
 async def generate_video(user_id:Annotated[str, Form(...)], context:Annotated[str, Form(...)]):
     youtube = Youtube(os.getenv('YOUTUBE_API_KEY'))
-    search_response = youtube.search_youtube(context)
-    video_id_visited = []
     video_limit = 10
-    while search_response.next_page_token or search_response.prev_page_token:
-        for i,search_result in enumerate(search_response.search_results):
-            if search_result.video_id not in video_id_visited:
+
+    chunks_dir = "src/backend/services/chunks"
+    downloads_dir = "src/backend/services/downloads"
+    os.makedirs(chunks_dir, exist_ok=True)
+    os.makedirs(downloads_dir, exist_ok=True)
+
+    # Each video is rendered independently on the bounded pool so the event loop stays free.
+    # Search pages are followed only while fewer than video_limit videos are done or in flight.
+    loop = asyncio.get_running_loop()
+    video_id_visited = []
+    seen = set()
+    pending = set()
+
+    async def collect(return_when):
+        nonlocal pending
+        done, pending = await asyncio.wait(pending, return_when=return_when)
+        video_id_visited.extend(task.result() for task in done if task.result())
+
+    try:
+        search_results = youtube.iter_search_results(context, max_results=video_limit)
+        async with aclosing(search_results):
+            async for search_result in search_results:
+                if search_result.video_id in seen:
+                    continue
+                seen.add(search_result.video_id)
+                while pending and len(video_id_visited) + len(pending) >= video_limit:
+                    await collect(asyncio.FIRST_COMPLETED)
                 if len(video_id_visited) >= video_limit:
                     break
-                
-                video_id = search_result.video_id
-                try:
-                    # Check if directories exist
-                    chunks_dir = "src/backend/services/chunks"
-                    downloads_dir = "src/backend/services/downloads"
-                    os.makedirs(chunks_dir, exist_ok=True)
-                    os.makedirs(downloads_dir, exist_ok=True)
-
-                    print(f"\nProcessing video {video_id}...")
-                    
-                    transcript = youtube.download_youtube_transcript(video_id)
-                    if not transcript:
-                        print(f"No transcript available for video {video_id}")
-                        continue
-                        
-                    chunk_path, output_path, subtitles_file, video_length = youtube.process_transcript_alternative(video_id, gemini)
-                    if not os.path.exists(output_path):
-                        print(f"Failed to create output video at {output_path}")
-                        continue
-
-
-
-                    video_metadata = Video_Metadata(
-                        video_id=video_id,
-                        video_summary="",
-                        length=video_length,
-                        user_id=user_id,
-                    )
-
-                    db = next(get_db())
-                    db.add(video_metadata)
-                    db.commit()
-                    video_id_visited.append(video_id)
-                    
- 
-                    
-                except Exception as e:
-                    print(f"Error processing video {video_id}: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
-                
+                pending.add(loop.run_in_executor(video_executor, process_video, youtube, search_result.video_id, user_id))
+    except QuotaExceededError as e:
+        if not pending:
+            raise HTTPException(status_code=429, detail=str(e))
+    if pending:
+        await collect(asyncio.ALL_COMPLETED)
+
     return {
         "message": "Video processing complete",
         "videos_processed": len(video_id_visited),
@@ -217,10 +267,10 @@ async def generate_quiz(
     doc_id: Annotated[str, Form()],
     db: Session = Depends(get_db)
 ):
-    material = db.query(Material).filter(Material.id == doc_id).first()
-    if not material:
+    text = document_text(db, doc_id)
+    if not text:
         raise HTTPException(status_code=404, detail="No materials found for this user and course")
-    quiz_content = gemini.generate_quiz(material.text)
+    quiz_content = gemini.generate_quiz(text)
     for quiz in quiz_content.parsed:
         questions = Questions(
             user_id = user_id,
@@ -239,13 +289,12 @@ async def generate_quiz(
 
 
 @app.post("/generate-image")
-async def generate_image(
+def generate_image(
     user_id: Annotated[str, Form(...)], 
     course_id: Annotated[str, Form(...)], 
-    material_id: Annotated[str, Form(...)]
+    material_id: Annotated[str, Form(...)],
+    db: Session = Depends(get_db)
 ):
-    db: Session = get_db()
-    
     material = db.query(Material).join(
         Material_Metadata,
         Material.id == Material_Metadata.material_id
@@ -268,9 +317,7 @@ async def generate_image(
     return {"message": "Image generated and stored successfully"}
 
 @app.get("/get-image/{material_id}")
-async def get_image(material_id: str):
-    db: Session = get_db()
-    
+def get_image(material_id: str, db: Session = Depends(get_db)):
     # Fetch the material record from the database
     material = db.query(Material).filter(Material.id == material_id).first()
     
@@ -281,22 +328,74 @@ async def get_image(material_id: str):
     return Response(content=material.image, media_type="image/png")
 
 @app.get("/get-note/{doc_id}")
-async def get_note(doc_id: str):
-    material = get_db().query(Material).filter(Material.id == doc_id).first()
+def get_note(doc_id: str, include_text: bool = False, include_embedding: bool = False, db: Session = Depends(get_db)):
+    columns = [Material.id, Material.doc_id, Material.chunk_id, Material.created_at]
+    if include_text:
+        columns.append(Material.text)
+    if include_embedding:
+        columns.append(Material.embedding)
+    material = db.execute(select(*columns).where(Material.id == doc_id)).mappings().first()
     if not material:
         raise HTTPException(status_code=404, detail="Material not found")
+    material = dict(material)
+    if include_embedding:
+        # Compact storage backends decode to NumPy arrays, which are not JSON serialisable
+        material["embedding"] = [float(x) for x in material["embedding"]]
     return {"material": material}
 
 @app.post("/get-all-notes")
-async def get_all_notes(user_id: Annotated[str, Form(...)], db: Session = Depends(get_db)):
-    materials = db.query(Material_Metadata).filter(
-        Material_Metadata.user_id == user_id
-    ).all()
-    
-    if not materials:
-        return {"materials": []}
-    
-    return {"materials": materials}
+def get_all_notes(
+    user_id: Annotated[str, Form(...)],
+    cursor: Annotated[Optional[str], Form()] = None,
+    limit: Annotated[int, Form()] = DEFAULT_PAGE_SIZE,
+    include_summary: Annotated[bool, Form()] = False,
+    db: Session = Depends(get_db)
+):
+    columns = [Material_Metadata.id, Material_Metadata.name, Material_Metadata.created_at, Material_Metadata.video_url, Material_Metadata.file_url, Material_Metadata.user_id]
+    if include_summary:
+        columns += [Material_Metadata.summary, Material_Metadata.video_summary]
+    try:
+        materials, next_cursor = keyset_page(db, Material_Metadata, columns, [Material_Metadata.user_id == user_id], cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"materials": materials, "next_cursor": next_cursor}
+
+
+@app.post("/search-notes")
+def search_notes(
+    user_id: Annotated[str, Form(...)],
+    query: Annotated[str, Form(...)],
+    k: Annotated[int, Form()] = 10,
+    source: Annotated[str, Form()] = "materials",
+    db: Session = Depends(get_db)
+):
+    if source not in VectorIndexRegistry.SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(VectorIndexRegistry.SOURCES)}")
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    index = vector_indexes.get(db, user_id, source)
+    if index is None:
+        return {"results": []}
+    query_embedding = co_client.embed_batch([query], input_type="search_query")[0]
+    hits = index.search(query_embedding, k=k)
+    if not hits:
+        return {"results": []}
+
+    model = Material if source == "materials" else Video_Transcript
+    rows = db.query(model).options(defer(model.embedding)).filter(model.id.in_([row_id for row_id, _ in hits])).all()
+    rows_by_id = {row.id: row for row in rows}
+    results = []
+    for row_id, score in hits:
+        row = rows_by_id.get(row_id)
+        if row is None:
+            continue
+        result = {"id": row.id, "chunk_id": row.chunk_id, "text": row.text, "score": score}
+        if source == "materials":
+            result.update(doc_id=row.doc_id, page_start=row.page_start, page_end=row.page_end)
+        else:
+            result.update(video_id=row.video_id, start_time=row.start_time, end_time=row.end_time)
+        results.append(result)
+    return {"results": results}
 
 
 @app.post("/upload-material/")
@@ -304,52 +403,21 @@ async def upload_material(
     name: Annotated[str, Form()],
     user_id: Annotated[str, Form()],
     file: UploadFile = File(...),
-    video_url: Annotated[str | None, Form()] = None  # This makes it optional
+    video_url: Annotated[str | None, Form()] = None,  # This makes it optional
+    db: Session = Depends(get_db)
 ):
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-        shutil.copyfileobj(file.file, temp_file)
-        temp_file_path = temp_file.name
-    try:
-        material_metadata = Material_Metadata(
-            video_url=video_url,  # Can be None now
-            video_summary=None,
-            name=name,
-            user_id=user_id
-        )
-        
-        # Only generate video summary if video_url is provided
-        if video_url:
-            material_metadata.video_summary = gemini.summarize_video(video_url, "video/mp4")
-        
-        db = next(get_db())
-        db.add(material_metadata)
-        db.commit()
-        db.refresh(material_metadata)
-
-        pages = extract_text_from_file(temp_file_path).pages
-        text = ""
-        for i, page in enumerate(pages):
-            page_text = page.markdown
-            embedding = co_client.embed([page_text]).embeddings.float[0]
-            text += " " + page_text
-            material = Material(
-                text=text,
-                doc_id=material_metadata.id,  # Use the id from metadata
-                chunk_id=i,
-                embedding=embedding
-            )
-            db.add(material)
-            db.commit()
-        # Generate embeddings for the full text
-        summary = gemini.generate_summary(text)
-        material_metadata.summary = str(summary.text)
-        material_metadata.file_url = get_signed_url(temp_file_path)
-        material_metadata.video_url = video_url
-        db.commit()
-        return {"message": f"Successfully processed and stored {len(pages)} chunks from {file.filename}"}
-    finally:
-        os.unlink(temp_file_path)
+    # OCR, embedding and summarisation run on the ingestion workers; poll /ingestion-jobs/{job_id}
+    file_path = await asyncio.to_thread(save_upload, file.file, file.filename)
+    job = create_job(db, user_id, name, file_path, video_url)
+    await ingestion_queue.submit(job.id)
+    return {"message": f"Accepted {file.filename} for processing", "job_id": job.id, "status": job.status}
+
+@app.get("/ingestion-jobs/{job_id}")
+async def get_ingestion_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(Ingestion_Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job_status(job)
 
 @app.post("/create-user/")
 async def create_user(
@@ -1,4 +1,4 @@
-from .ocr_mistral import extract_text_from_file
+from .ocr_mistral import iter_pages_from_file
 from .gemini_client import Gemini, GeminiModel, GeminiEmbeddingModel
 from .cohere_client import Cohere
 from .youtube import Youtube
@@ -0,0 +1,194 @@
+import os
+import re
+import threading
+from typing import Iterable, Iterator
+from src.backend.services.pydantic_models import OCRPage, MaterialChunk
+
+# embed-english-v3.0 truncates inputs past 512 tokens; the default leaves
+# headroom for the approximate counter used when no tokenizer file is set
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 400))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 50))
+# Optional tokenizer.json for the embedding model, loaded with Hugging Face tokenizers
+CHUNK_TOKENIZER_PATH = os.getenv("CHUNK_TOKENIZER_PATH")
+# A chunk may end up to this fraction of the window early to finish on a sentence
+SENTENCE_SEARCH_FRACTION = 0.2
+PAGE_SEPARATOR = "\n\n"
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+# BPE vocabularies average about four characters of English per token
+APPROX_CHARS_PER_TOKEN = 4
+SENTENCE_END = re.compile(r"[.!?…]['\")\]]*$")
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None and CHUNK_TOKENIZER_PATH and os.path.exists(CHUNK_TOKENIZER_PATH):
+            from tokenizers import Tokenizer
+            _tokenizer = Tokenizer.from_file(CHUNK_TOKENIZER_PATH)
+        return _tokenizer
+
+
+def token_spans(text:str) -> list[tuple[int, int]]:
+    """
+    Character (start, end) of every token in text.
+
+    Uses the model's tokenizer when CHUNK_TOKENIZER_PATH is set, otherwise
+    splits words into APPROX_CHARS_PER_TOKEN pieces, which over-counts
+    rather than under-counts for English.
+    """
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return [(start, end) for start, end in tokenizer.encode(text, add_special_tokens=False).offsets if end > start]
+    spans = []
+    for match in WORD_PATTERN.finditer(text):
+        for start in range(match.start(), match.end(), APPROX_CHARS_PER_TOKEN):
+            spans.append((start, min(start + APPROX_CHARS_PER_TOKEN, match.end())))
+    return spans
+
+
+def count_tokens(text:str) -> int:
+    return len(token_spans(text))
+
+
+class _Window:
+    """Tokens waiting to be emitted, plus the text of every page they reference"""
+    def __init__(self):
+        self.tokens: list[tuple[int, int, int]] = []  # (page index, start, end)
+        self.pages: dict[int, str] = {}
+
+    def text(self, start:tuple[int, int], end:tuple[int, int]) -> str:
+        """Text from (page, offset) start up to (page, offset) end, joining pages with PAGE_SEPARATOR"""
+        (start_page, start_offset), (end_page, end_offset) = start, end
+        if start_page == end_page:
+            return self.pages[start_page][start_offset:end_offset]
+        parts = [self.pages[start_page][start_offset:]]
+        parts += [self.pages[page] for page in range(start_page + 1, end_page) if page in self.pages]
+        parts.append(self.pages[end_page][:end_offset])
+        return PAGE_SEPARATOR.join(parts)
+
+    def ends_sentence(self, position:int) -> bool:
+        page, start, end = self.tokens[position]
+        if position + 1 < len(self.tokens) and self.tokens[position + 1][0] != page:
+            return True
+        text = self.pages[page]
+        return bool(SENTENCE_END.search(text[start:end])) or text[end:end + 1] == "\n"
+
+    def starts_word(self, position:int) -> bool:
+        """Whether a cut before this token would leave no word split in two"""
+        page, start, _ = self.tokens[position]
+        if position == 0 or self.tokens[position - 1][0] != page:
+            return True
+        return self.tokens[position - 1][2] < start or not self.pages[page][start - 1].isalnum()
+
+    def drop_unreferenced_pages(self, keep_from:int):
+        first_page = min(self.tokens[0][0], keep_from) if self.tokens else keep_from
+        for page in [page for page in self.pages if page < first_page]:
+            del self.pages[page]
+
+
+def iter_chunks(pages:Iterable[OCRPage], max_tokens:int=CHUNK_MAX_TOKENS, overlap:int=CHUNK_OVERLAP_TOKENS) -> Iterator[MaterialChunk]:
+    """
+    Regroup a stream of pages into chunks of at most max_tokens tokens.
+
+    Chunks cross page boundaries, so sparse slides are merged and dense pages
+    are split. Consecutive chunks share `overlap` tokens, and a chunk ends on
+    a sentence or page boundary when one falls in the last
+    SENTENCE_SEARCH_FRACTION of the window. Only the current window is held
+    in memory, so chunks are yielded while later pages are still being OCR'd;
+    each chunk is held back until the next is cut, so the last one can be
+    extended to the end of the document.
+
+    Chunks tile the document: the whitespace between two chunks opens the
+    later one, and the first and last reach the document's start and end, so
+    joining each chunk's text past its overlap_chars gives back
+    PAGE_SEPARATOR.join(page.markdown for page in pages) exactly.
+    """
+    if not 0 <= overlap < max_tokens:
+        raise ValueError(f"overlap must be in [0, {max_tokens}), got {overlap}")
+    window = _Window()
+    previous_end = None
+    fresh = 0  # tokens in the window not yet emitted in any chunk
+
+    def emit(count:int) -> MaterialChunk:
+        nonlocal previous_end
+        first, last = window.tokens[0], window.tokens[count - 1]
+        start, end = (first[0], first[1]), (last[0], last[2])
+        if previous_end is None:
+            start = (min(window.pages), 0)
+        elif previous_end < start:
+            start = previous_end
+        overlap_chars = 0
+        if previous_end is not None and start < previous_end:
+            overlap_chars = len(window.text(start, previous_end))
+        previous_end = end
+        return MaterialChunk(
+            text=window.text(start, end),
+            page_start=start[0],
+            char_start=start[1],
+            page_end=end[0],
+            char_end=end[1],
+            token_count=count,
+            overlap_chars=overlap_chars,
+        )
+
+    def extend_to_document_end(chunk:MaterialChunk) -> MaterialChunk:
+        last_page = max(window.pages)
+        end = (last_page, len(window.pages[last_page]))
+        if (chunk.page_end, chunk.char_end) < end:
+            tail = window.text((chunk.page_end, chunk.char_end), end)
+            chunk = chunk.model_copy(update={"text": chunk.text + tail, "page_end": end[0], "char_end": end[1]})
+        return chunk
+
+    pending = None
+    for page in pages:
+        window.pages[page.index] = page.markdown
+        for start, end in token_spans(page.markdown):
+            window.tokens.append((page.index, start, end))
+            fresh += 1
+            if len(window.tokens) < max_tokens:
+                continue
+            earliest = max(overlap + 1, int(max_tokens * (1 - SENTENCE_SEARCH_FRACTION)))
+            # Prefer a sentence end, then a word boundary, then a hard cut
+            cut = next((position + 1 for position in range(max_tokens - 1, earliest - 2, -1) if window.ends_sentence(position)), None)
+            if cut is None:
+                cut = next((position for position in range(max_tokens - 1, earliest - 1, -1) if window.starts_word(position)), max_tokens)
+            chunk = emit(cut)
+            if pending is not None:
+                yield pending
+            pending = chunk
+            # The overlap starts on a word too, shrinking it rather than splitting a word
+            keep = cut - overlap
+            while keep < cut and not window.starts_word(keep):
+                keep += 1
+            window.tokens = window.tokens[keep:]
+            fresh = len(window.tokens) - (cut - keep)
+            window.drop_unreferenced_pages(keep_from=previous_end[0])
+    if fresh > 0:
+        chunk = emit(len(window.tokens))
+        if pending is not None:
+            yield pending
+        pending = chunk
+    if pending is not None:
+        yield extend_to_document_end(pending)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from src.backend.services.ocr_mistral import iter_pages_from_file
+    from src.backend.services.cohere_client import MAX_EMBED_BATCH_SIZE
+
+    # Compare embedding inputs and API calls for page chunks vs token chunks on one document
+    pages = list(iter_pages_from_file(sys.argv[1]))
+    started = time.perf_counter()
+    chunks = list(iter_chunks(pages))
+    elapsed = time.perf_counter() - started
+    page_tokens = [count_tokens(page.markdown) for page in pages]
+    print(f"{len(pages)} pages: {sum(1 for tokens in page_tokens if tokens > CHUNK_MAX_TOKENS)} over {CHUNK_MAX_TOKENS} tokens, "
+          f"{sum(1 for tokens in page_tokens if tokens < CHUNK_MAX_TOKENS // 4)} under {CHUNK_MAX_TOKENS // 4}")
+    print(f"{len(chunks)} chunks in {elapsed * 1000:.1f}ms, {sum(chunk.token_count for chunk in chunks) / max(len(chunks), 1):.0f} tokens on average")
+    print(f"Embed calls: {-(-len(pages) // MAX_EMBED_BATCH_SIZE)} for pages, {-(-len(chunks) // MAX_EMBED_BATCH_SIZE)} for chunks")
@@ -1,22 +1,36 @@
 import os
+import time
 import cohere
 import dotenv
+from concurrent.futures import ThreadPoolExecutor
+from src.backend.services.embedding_cache import EmbeddingCache, get_embedding_cache
 dotenv.load_dotenv()
 
+# Every stored vector and every query is embedded with this model; vectors
+# from different models are not comparable, so change it only alongside a
+# backfill of the stored rows
+EMBED_MODEL = os.getenv("EMBED_MODEL", "embed-english-v3.0")
+# Cohere rejects embed requests with more than 96 texts
+MAX_EMBED_BATCH_SIZE = 96
+MAX_CONCURRENT_EMBED_BATCHES = 4
+
 class Cohere:
-    def __init__(self, api_key:str):
-        self.co = cohere.Client(api_key)
-
-    def create_dataset(self, dataset_id:str):
-        ds = self.co.datasets.create(
-            name=dataset_id,
-            data=open("./transcript.jsonl", "rb"),
-            keep_fields=["chunk_id","text","video_id", "start_time", "end_time"],
-            type="embed-input",
-        )
+    def __init__(self, api_key:str, cache:EmbeddingCache=None, client=None):
+        # client lets callers substitute a stand-in that mimics cohere.Client
+        self.co = client if client is not None else cohere.Client(api_key)
+        self.cache = cache if cache is not None else get_embedding_cache()
+
+    def create_dataset(self, dataset_id:str, path:str="./transcript.jsonl", keep_fields:list[str]=["chunk_id","text","video_id", "start_time", "end_time"]):
+        with open(path, "rb") as data:
+            ds = self.co.datasets.create(
+                name=dataset_id,
+                data=data,
+                keep_fields=keep_fields,
+                type="embed-input",
+            )
         return ds
     
-    def embed(self, texts:list[str], model:str="embed-english-v3.0", input_type:str="search_document", embedding_types:list[str]=["float"]):
+    def embed(self, texts:list[str], model:str=EMBED_MODEL, input_type:str="search_document", embedding_types:list[str]=["float"]):
         response = self.co.embed(
             texts=texts,
             model=model,
@@ -24,12 +38,57 @@ class Cohere:
             embedding_types=embedding_types,
         )
         return response
+
+    def embed_batch(self, texts:list[str], model:str=EMBED_MODEL, input_type:str="search_document", batch_size:int=MAX_EMBED_BATCH_SIZE, max_concurrency:int=MAX_CONCURRENT_EMBED_BATCHES) -> list[list[float]]:
+        """
+        Embed any number of texts in max-size requests, keeping at most max_concurrency in flight.
+
+        Texts already in the embedding cache never reach the API.
+        """
+        embeddings = self.cache.get_many(model, input_type, texts)
+        # Deduplicate so repeated pages in one upload are embedded once
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        batch_size = min(batch_size, MAX_EMBED_BATCH_SIZE)
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        if not batches:
+            return embeddings
+
+        def embed_one(batch:list[str]) -> list[list[float]]:
+            return self.embed(batch, model=model, input_type=input_type).embeddings.float
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as executor:
+            results = executor.map(embed_one, batches)
+            fetched = [embedding for batch_embeddings in results for embedding in batch_embeddings]
+        self.cache.put_many(model, input_type, missing, fetched)
+        fetched_by_text = dict(zip(missing, fetched))
+        return [embedding if embedding is not None else fetched_by_text[text] for text, embedding in zip(texts, embeddings)]
     
-    def embed_job(self, dataset_id:str, model:str="embed-english-v3.0", input_type:str="search_document", embedding_types:list[str]=["float"]):
+    def embed_job(self, dataset_id:str, model:str=EMBED_MODEL, input_type:str="search_document", embedding_types:list[str]=["float"]):
         job = self.co.embed_jobs.create(
-            dataset_id=dataset_id, input_type=input_type, model=model
+            dataset_id=dataset_id, input_type=input_type, model=model, embedding_types=embedding_types, truncate="END"
         )
         return job
+
+    def wait_for_dataset(self, dataset_id:str, poll_interval:float=5, timeout:float=600):
+        """Block until an uploaded dataset has been validated"""
+        deadline = time.monotonic() + timeout
+        while True:
+            dataset = self.co.datasets.get(id=dataset_id).dataset
+            if dataset.validation_status == "validated":
+                return dataset
+            if dataset.validation_status == "failed":
+                raise Exception(f"Dataset {dataset_id} failed validation: {dataset.validation_error}")
+            if time.monotonic() > deadline:
+                raise Exception(f"Dataset {dataset_id} still {dataset.validation_status} after {timeout}s")
+            time.sleep(poll_interval)
+
+    def get_embed_job(self, job_id:str):
+        return self.co.embed_jobs.get(job_id)
+
+    def iter_dataset(self, dataset_id:str):
+        """Records of a dataset, e.g. the output of a finished embed job"""
+        dataset = self.co.datasets.get(id=dataset_id).dataset
+        yield from self.co.utils.dataset_generator(dataset)
     
 if __name__ == "__main__":
     co = Cohere(os.getenv('COHERE_API_KEY'))
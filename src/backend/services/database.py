@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+load_dotenv()
+
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT", 6543)  # Default to 6543 if not specified
+DB_NAME = os.getenv("DB_NAME")
+
+# Port 6543 is a transaction-mode pooler (PgBouncer/Supavisor): server connections
+# are shared between clients per transaction, so each process keeps a small local
+# pool, and idle connections are recycled before the pooler drops them.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 300))
+# Checkouts that wait longer than this are logged as a sign of pool exhaustion
+DB_POOL_SLOW_WAIT = float(os.getenv("DB_POOL_SLOW_WAIT_SECONDS", 0.5))
+
+# DATABASE_URL overrides the DB_* settings, e.g. a local Postgres or sqlite:///athena.db for tests
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+class PoolMetrics:
+    """Counters for connection checkouts, time spent waiting for one, and overflow use"""
+    def __init__(self, slow_wait:float=DB_POOL_SLOW_WAIT):
+        self.slow_wait = slow_wait
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.slow_waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.checked_out_peak = 0
+        self.overflow_peak = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds:float, timed_out:bool=False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+            if seconds > self.slow_wait:
+                self.slow_waits += 1
+        if seconds > self.slow_wait:
+            print(f"Waited {seconds:.2f}s for a database connection{' and timed out' if timed_out else ''}")
+
+    def record_checkout(self, pool:QueuePool):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out_peak = max(self.checked_out_peak, pool.checkedout())
+            self.overflow_peak = max(self.overflow_peak, pool.overflow())
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self, pool:QueuePool) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": DB_MAX_OVERFLOW,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # QueuePool reports overflow relative to pool_size, negative until the pool is full
+                "overflow": max(pool.overflow(), 0),
+                "checked_out_peak": self.checked_out_peak,
+                "overflow_peak": self.overflow_peak,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "slow_waits": self.slow_waits,
+                "wait_avg_ms": 1000 * self.wait_total / waits if waits else 0.0,
+                "wait_max_ms": 1000 * self.wait_max,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits, including opening a new connection"""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=MeteredQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    # The pooler can close server connections underneath us; test before use
+    pool_pre_ping=True,
+    # Reuse the most recent connection so surplus ones go idle and get recycled
+    pool_use_lifo=True,
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.record_checkout(engine.pool)
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metrics.record_checkin()
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.record_connect()
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.record_invalidation()
+
+
+def get_db():
+    """FastAPI dependency: one session per request, always returned to the pool"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def session_scope():
+    """Session for work outside a request; rolls back on error and always closes"""
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def pool_stats() -> dict:
+    return pool_metrics.stats(engine.pool)
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import sessionmaker
+from src.backend.services.cohere_client import Cohere, EMBED_MODEL
+from src.backend.services.database import SessionLocal
+from src.backend.services.models import Material, Video_Transcript
+
+BACKFILL_BATCH_ROWS = int(os.getenv("BACKFILL_BATCH_ROWS", 10_000))
+BACKFILL_POLL_SECONDS = float(os.getenv("BACKFILL_POLL_SECONDS", 15))
+BACKFILL_STATE_DIR = os.getenv("BACKFILL_STATE_DIR", "src/backend/services/cache/backfill")
+# Rows per executemany when writing vectors back
+WRITE_BATCH_SIZE = 500
+# Rows fetched per round trip while streaming a batch out of Postgres
+STREAM_CHUNK_SIZE = 1000
+SOURCES = {"materials": Material, "video_transcript": Video_Transcript}
+
+
+class BackfillState:
+    """
+    Progress of one (source, model) backfill, persisted as JSON after every step.
+
+    after_id is the highest row id whose new vector is committed. batch is the
+    batch in flight, recording its id range and, once submitted, its dataset
+    and embed job, so a restarted run picks the same job back up.
+    """
+    def __init__(self, path:str):
+        self.path = path
+        self.after_id = 0
+        self.rows_done = 0
+        self.batch = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.__dict__.update(json.load(f))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"after_id": self.after_id, "rows_done": self.rows_done, "batch": self.batch}, f)
+        os.replace(temp_path, self.path)
+
+
+class EmbedBackfill:
+    """
+    Re-embed every row of a table through Cohere embed jobs instead of one embed call per batch of texts.
+
+    Each batch of rows is streamed into a JSONL dataset, embedded by an async
+    embed job and written back with bulk UPDATEs. Restart the API afterwards:
+    its in-memory vector indexes still hold the old vectors.
+    """
+    def __init__(self, co_client:Cohere, session_factory:sessionmaker=SessionLocal, model:str=EMBED_MODEL,
+                 batch_rows:int=BACKFILL_BATCH_ROWS, poll_interval:float=BACKFILL_POLL_SECONDS, state_dir:str=BACKFILL_STATE_DIR):
+        # Queries are embedded with EMBED_MODEL, so rows embedded with anything else would never match them
+        if model != EMBED_MODEL:
+            raise ValueError(f"Backfill model {model} differs from EMBED_MODEL {EMBED_MODEL}; set EMBED_MODEL to switch models")
+        self.co_client = co_client
+        self.session_factory = session_factory
+        self.model = model
+        self.batch_rows = batch_rows
+        self.poll_interval = poll_interval
+        self.state_dir = state_dir
+
+    def run(self, source:str) -> int:
+        table = SOURCES[source]
+        state = BackfillState(os.path.join(self.state_dir, f"{source}-{self.model}.json"))
+        total = self._count(table)
+        started = time.perf_counter()
+        while True:
+            if state.batch is None:
+                batch = self._export(source, table, state.after_id)
+                if batch is None:
+                    break
+                state.batch = batch
+                state.save()
+            batch = state.batch
+            if batch["count"]:
+                if batch.get("job_id") is None:
+                    if batch.get("dataset_id") is None:
+                        batch["dataset_id"] = self.co_client.create_dataset(
+                            f"backfill-{source}-{batch['first_id']}", path=batch["path"], keep_fields=["row_id"]
+                        ).id
+                        state.save()
+                    self.co_client.wait_for_dataset(batch["dataset_id"], poll_interval=self.poll_interval)
+                    batch["job_id"] = self.co_client.embed_job(batch["dataset_id"], model=self.model).job_id
+                    state.save()
+                written = self._write_back(table, self._wait(batch["job_id"]))
+                print(f"{source}: wrote {written} vectors for ids {batch['first_id']}-{batch['last_id']}")
+            state.after_id = batch["last_id"]
+            state.rows_done += batch["rows"]
+            state.batch = None
+            state.save()
+            if os.path.exists(batch["path"]):
+                os.remove(batch["path"])
+            elapsed = time.perf_counter() - started
+            print(f"{source}: {state.rows_done}/{total} rows ({100 * state.rows_done / max(total, 1):.1f}%), {elapsed:.0f}s elapsed")
+        print(f"{source}: backfill with {self.model} complete, {state.rows_done} rows")
+        return state.rows_done
+
+    def _count(self, table) -> int:
+        db = self.session_factory()
+        try:
+            return db.scalar(select(func.count()).select_from(table))
+        finally:
+            db.close()
+
+    def _export(self, source:str, table, after_id:int) -> dict | None:
+        """Stream the next batch of rows into a JSONL file; None once every row is done"""
+        path = os.path.join(self.state_dir, f"{source}-{self.model}-{after_id}.jsonl")
+        os.makedirs(self.state_dir, exist_ok=True)
+        first_id, last_id, rows, count = None, None, 0, 0
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                select(table.id, table.text).where(table.id > after_id).order_by(table.id).limit(self.batch_rows)
+                .execution_options(yield_per=STREAM_CHUNK_SIZE)
+            )
+            with open(path, "w", encoding="utf-8") as f:
+                for row_id, text in result:
+                    first_id = row_id if first_id is None else first_id
+                    last_id = row_id
+                    rows += 1
+                    # Embed jobs reject empty inputs; those rows keep their current vector
+                    if text and text.strip():
+                        f.write(json.dumps({"row_id": row_id, "text": text}) + "\n")
+                        count += 1
+        finally:
+            db.close()
+        if rows == 0:
+            os.remove(path)
+            return None
+        return {"first_id": first_id, "last_id": last_id, "rows": rows, "count": count, "path": path, "dataset_id": None, "job_id": None}
+
+    def _wait(self, job_id:str) -> str:
+        """Poll an embed job until it finishes and return its output dataset id"""
+        while True:
+            job = self.co_client.get_embed_job(job_id)
+            if job.status == "complete":
+                return job.output_dataset_id
+            if job.status in ("failed", "cancelled"):
+                raise Exception(f"Embed job {job_id} {job.status}")
+            print(f"Embed job {job_id} is {job.status}")
+            time.sleep(self.poll_interval)
+
+    def _write_back(self, table, dataset_id:str) -> int:
+        written = 0
+        db = self.session_factory()
+        try:
+            rows = []
+            for record in self.co_client.iter_dataset(dataset_id):
+                embeddings = record.get("embeddings")
+                embedding = embeddings["float"] if isinstance(embeddings, dict) else record["embedding"]
+                rows.append({"id": record["row_id"], "embedding": embedding})
+                if len(rows) == WRITE_BATCH_SIZE:
+                    db.execute(update(table), rows)
+                    written += len(rows)
+                    rows = []
+            if rows:
+                db.execute(update(table), rows)
+                written += len(rows)
+            # One commit per batch, so a batch is either fully written or retried
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return written
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Re-embed stored rows with Cohere embed jobs")
+    parser.add_argument("sources", nargs="*", choices=list(SOURCES), help="defaults to every source")
+    parser.add_argument("--model", default=EMBED_MODEL, help="must match EMBED_MODEL")
+    parser.add_argument("--batch-rows", type=int, default=BACKFILL_BATCH_ROWS)
+    args = parser.parse_args()
+
+    backfill = EmbedBackfill(Cohere(os.getenv('COHERE_API_KEY')), model=args.model, batch_rows=args.batch_rows)
+    for source in args.sources or list(SOURCES):
+        backfill.run(source)
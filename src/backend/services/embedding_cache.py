@@ -0,0 +1,197 @@
+import os
+import hashlib
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "src/backend/services/cache/embeddings.db")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 50_000))
+# Vectors are held as float32 arrays, 4 KiB each at 1024 dimensions; the byte
+# bounds keep both tiers well inside a 512Mi Cloud Run container, whose
+# filesystem is also in memory
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 48 * 1024 * 1024))
+EMBEDDING_CACHE_DISK_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_BYTES", 64 * 1024 * 1024))
+# The disk tier is measured, and trimmed back under its bound, once every this many writes
+DISK_TRIM_INTERVAL = 64
+
+
+def cache_key(*parts:str) -> str:
+    """SHA-256 over the parts, separated so ("ab", "c") and ("a", "bc") differ"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe bounded mapping that evicts the least recently used entry.
+
+    With max_bytes and sizeof set, entries are also evicted once their
+    sizeof() total passes max_bytes.
+    """
+    def __init__(self, max_size:int, max_bytes:int=None, sizeof=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            if self.sizeof is not None:
+                if key in self._entries:
+                    self.nbytes -= self.sizeof(self._entries[key])
+                self.nbytes += self.sizeof(value)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size or (self.max_bytes is not None and self.nbytes > self.max_bytes and len(self._entries) > 1):
+                _, evicted = self._entries.popitem(last=False)
+                if self.sizeof is not None:
+                    self.nbytes -= self.sizeof(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+def trim_sqlite_cache(conn:sqlite3.Connection, table:str, size_expression:str, max_bytes:int) -> int:
+    """
+    Delete the least recently used rows of a cache table until it is back under max_bytes.
+
+    The table needs a last_used column and a rowid. Trims to 90% of the
+    bound, so a cache sitting at its limit is not trimmed on every write.
+    Returns the number of rows deleted.
+    """
+    rows, total = conn.execute(f"SELECT COUNT(*), COALESCE(SUM({size_expression}), 0) FROM {table}").fetchone()
+    if total <= max_bytes or rows == 0:
+        return 0
+    excess = total - int(0.9 * max_bytes)
+    # Rows are dropped in proportion to the average row size
+    count = min(rows, -(-excess * rows // total))
+    conn.execute(f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)", (count,))
+    return count
+
+
+def ensure_last_used(conn:sqlite3.Connection, table:str):
+    """Add and index the last_used column on cache files created before it existed"""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if "last_used" not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_last_used ON {table} (last_used)")
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model, input_type, sha256(text)).
+
+    Lookups hit the in-memory LRU first and fall back to a SQLite file that
+    survives restarts. Vectors are held as float32 arrays in memory and raw
+    float32 bytes on disk; both tiers evict least recently used vectors
+    once they pass their byte bounds.
+    """
+    def __init__(self, path:str=EMBEDDING_CACHE_PATH, max_size:int=EMBEDDING_CACHE_SIZE,
+                 max_bytes:int=EMBEDDING_CACHE_MAX_BYTES, disk_max_bytes:int=EMBEDDING_CACHE_DISK_MAX_BYTES):
+        self.memory = LRUCache(max_size, max_bytes=max_bytes, sizeof=lambda vector: vector.nbytes)
+        self.path = path
+        self.disk_max_bytes = disk_max_bytes
+        self._writes = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL DEFAULT 0)")
+        ensure_last_used(self._conn, "embeddings")
+        self._conn.commit()
+
+    def get_many(self, model:str, input_type:str, texts:list[str]) -> list[np.ndarray | None]:
+        keys = [cache_key(model, input_type, text) for text in texts]
+        results = [self.memory.get(key) for key in keys]
+        missing = [key for key, result in zip(keys, results) if result is None]
+        stored = {}
+        if missing:
+            with self._lock:
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(missing), 500):
+                    batch = missing[i:i + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ).fetchall()
+                    stored.update(rows)
+                if stored:
+                    now = time.time()
+                    self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in stored])
+                    self._conn.commit()
+        with self._lock:
+            for i, key in enumerate(keys):
+                if results[i] is not None:
+                    self.hits["memory"] += 1
+                elif key in stored:
+                    results[i] = np.frombuffer(stored[key], dtype=np.float32)
+                    self.memory.put(key, results[i])
+                    self.hits["disk"] += 1
+                else:
+                    self.misses += 1
+        return results
+
+    def put_many(self, model:str, input_type:str, texts:list[str], embeddings:list[list[float]]):
+        rows = []
+        now = time.time()
+        for text, embedding in zip(texts, embeddings):
+            key = cache_key(model, input_type, text)
+            vector = np.asarray(embedding, dtype=np.float32)
+            self.memory.put(key, vector)
+            rows.append((key, vector.tobytes(), now))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self._writes += 1
+            if self._writes % DISK_TRIM_INTERVAL == 0:
+                trim_sqlite_cache(self._conn, "embeddings", "LENGTH(vector)", self.disk_max_bytes)
+            self._conn.commit()
+
+    def get(self, model:str, input_type:str, text:str) -> np.ndarray | None:
+        return self.get_many(model, input_type, [text])[0]
+
+    def put(self, model:str, input_type:str, text:str, embedding:list[float]):
+        self.put_many(model, input_type, [text], [embedding])
+
+    def stats(self) -> dict:
+        lookups = self.hits["memory"] + self.hits["disk"] + self.misses
+        return {
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.nbytes,
+        }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache shared by the Cohere and Gemini clients"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+        return _shared_cache
@@ -0,0 +1,246 @@
+import os
+import json
+import numpy as np
+from sqlalchemy import ARRAY, Float, LargeBinary, text
+from sqlalchemy.types import TypeDecorator
+
+try:
+    from pgvector.sqlalchemy import Vector
+except ImportError:
+    Vector = None
+
+# How Material and Video_Transcript embeddings are stored:
+#   array    double precision[] (the original schema)
+#   float32  little-endian float32 bytea, decoded zero-copy with np.frombuffer
+#   int8     per-vector scaled int8 bytea, a quarter of float32
+#   pgvector pgvector's vector(EMBEDDING_DIM) type, needs the extension and package
+# Switching an existing database takes a migration: python -m src.backend.services.embedding_storage migrate <backend>
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "array")
+# embed-english-v3.0 vectors; only pgvector columns are fixed-width
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", 1024))
+EMBEDDING_TABLES = ["materials", "video_transcript"]
+MIGRATION_BATCH_SIZE = int(os.getenv("EMBEDDING_MIGRATION_BATCH_SIZE", 1000))
+
+
+class ArrayBackend:
+    name = "array"
+    ddl = "double precision[]"
+    bind = ":value"
+
+    def column_type(self):
+        return ARRAY(Float)
+
+    def encode(self, vector) -> list[float]:
+        return [float(x) for x in vector]
+
+    def decode(self, value) -> np.ndarray:
+        return np.asarray(value, dtype=np.float32)
+
+
+class Float32Backend:
+    name = "float32"
+    ddl = "bytea"
+    bind = ":value"
+
+    def column_type(self):
+        return EmbeddingBytes(self)
+
+    def encode(self, vector) -> bytes:
+        return np.asarray(vector, dtype="<f4").tobytes()
+
+    def decode(self, value) -> np.ndarray:
+        # A read-only view over the driver's buffer; nothing is copied
+        return np.frombuffer(value, dtype="<f4")
+
+
+class Int8Backend:
+    """
+    Symmetric scalar quantisation with one float32 scale per vector.
+
+    Scoring is asymmetric: only documents are quantised and queries stay
+    float32. There is no rescoring step, since no full-precision copy of the
+    documents is kept to rescore against; the benchmark's recall figure is
+    the ranking loss this leaves.
+    """
+    name = "int8"
+    ddl = "bytea"
+    bind = ":value"
+
+    def column_type(self):
+        return EmbeddingBytes(self)
+
+    def encode(self, vector) -> bytes:
+        vector = np.asarray(vector, dtype=np.float32)
+        scale = float(np.abs(vector).max()) / 127 or 1.0
+        codes = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        return np.array(scale, dtype="<f4").tobytes() + codes.tobytes()
+
+    def decode(self, value) -> np.ndarray:
+        scale = np.frombuffer(value, dtype="<f4", count=1)[0]
+        return np.frombuffer(value, dtype=np.int8, offset=4).astype(np.float32) * scale
+
+
+class PgvectorBackend:
+    name = "pgvector"
+    bind = "CAST(:value AS vector)"
+
+    @property
+    def ddl(self) -> str:
+        return f"vector({EMBEDDING_DIM})"
+
+    def column_type(self):
+        if Vector is None:
+            raise ImportError("EMBEDDING_STORAGE=pgvector needs the pgvector package: pip install pgvector")
+        return Vector(EMBEDDING_DIM)
+
+    def encode(self, vector) -> str:
+        return "[" + ",".join(repr(float(x)) for x in vector) + "]"
+
+    def decode(self, value) -> np.ndarray:
+        # Unregistered connections return pgvector's text form
+        if isinstance(value, str):
+            value = json.loads(value)
+        return np.asarray(value, dtype=np.float32)
+
+
+class EmbeddingBytes(TypeDecorator):
+    """bytea column that takes any float sequence and reads back a NumPy vector"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self.backend.encode(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.backend.decode(value)
+
+
+BACKENDS = {backend.name: backend for backend in (ArrayBackend(), Float32Backend(), Int8Backend(), PgvectorBackend())}
+
+
+def get_backend(name:str=EMBEDDING_STORAGE):
+    if name not in BACKENDS:
+        raise ValueError(f"EMBEDDING_STORAGE must be one of {', '.join(BACKENDS)}, got {name}")
+    return BACKENDS[name]
+
+
+def embedding_column_type():
+    """Column type for Material.embedding and Video_Transcript.embedding under the configured backend"""
+    return get_backend().column_type()
+
+
+def ensure_extension(bind, backend_name:str=EMBEDDING_STORAGE):
+    if backend_name == "pgvector":
+        with bind.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
+
+def migrate_embeddings(bind, target:str, source:str=EMBEDDING_STORAGE, batch_size:int=MIGRATION_BATCH_SIZE):
+    """
+    Re-encode every stored embedding from the source backend into the target one.
+
+    Rows are copied into an embedding_new column in id order, one committed
+    batch at a time, so an interrupted run resumes where it stopped. The
+    columns are swapped in a single transaction once every row is copied.
+    Pause ingestion while it runs, then set EMBEDDING_STORAGE to the target
+    before restarting the services.
+    """
+    source_backend, target_backend = get_backend(source), get_backend(target)
+    if source_backend is target_backend:
+        print(f"Embeddings are already stored as {target}")
+        return
+    ensure_extension(bind, target)
+    for table in EMBEDDING_TABLES:
+        with bind.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_new {target_backend.ddl}"))
+        migrated, after = 0, -1
+        while True:
+            with bind.begin() as connection:
+                rows = connection.execute(
+                    text(f"SELECT id, embedding FROM {table} WHERE id > :after AND embedding_new IS NULL ORDER BY id LIMIT :limit"),
+                    {"after": after, "limit": batch_size},
+                ).all()
+                if not rows:
+                    break
+                connection.execute(
+                    text(f"UPDATE {table} SET embedding_new = {target_backend.bind} WHERE id = :id"),
+                    [{"id": row_id, "value": target_backend.encode(source_backend.decode(embedding))} for row_id, embedding in rows],
+                )
+            migrated += len(rows)
+            after = rows[-1][0]
+            print(f"{table}: re-encoded {migrated} embeddings as {target}")
+        with bind.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table} DROP COLUMN embedding"))
+            connection.execute(text(f"ALTER TABLE {table} RENAME COLUMN embedding_new TO embedding"))
+            connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN embedding SET NOT NULL"))
+        print(f"{table}: embedding column is now {target_backend.ddl}")
+
+
+def benchmark(bind, count:int=20_000, dim:int=EMBEDDING_DIM, k:int=10):
+    """
+    Stored bytes per vector, load throughput and (for int8) top-k recall against float32.
+
+    Each backend's vectors are written to a scratch table, sized with
+    pg_column_size (LENGTH elsewhere) and read back with a plain SELECT, so
+    the load figure covers the driver as well as decoding.
+    """
+    import time
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    queries = rng.standard_normal((100, dim), dtype=np.float32)
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+    postgres = bind.dialect.name == "postgresql"
+    size_function = "pg_column_size" if postgres else "LENGTH"
+    for backend in BACKENDS.values():
+        if backend.ddl != "bytea" and not postgres:
+            print(f"{backend.name:>8}: skipped, needs Postgres")
+            continue
+        try:
+            ensure_extension(bind, backend.name)
+        except Exception as e:
+            print(f"{backend.name:>8}: skipped ({e})")
+            continue
+        table = f"embedding_benchmark_{backend.name}"
+        with bind.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            connection.execute(text(f"CREATE TABLE {table} (id integer PRIMARY KEY, embedding {backend.ddl} NOT NULL)"))
+        try:
+            for i in range(0, count, MIGRATION_BATCH_SIZE):
+                with bind.begin() as connection:
+                    connection.execute(
+                        text(f"INSERT INTO {table} (id, embedding) VALUES (:id, {backend.bind})"),
+                        [{"id": row_id, "value": backend.encode(vectors[row_id])} for row_id in range(i, min(i + MIGRATION_BATCH_SIZE, count))],
+                    )
+            with bind.connect() as connection:
+                size = connection.execute(text(f"SELECT AVG({size_function}(embedding)) FROM {table}")).scalar()
+                started = time.perf_counter()
+                rows = connection.execute(text(f"SELECT embedding FROM {table} ORDER BY id")).all()
+                decoded = np.stack([backend.decode(value) for value, in rows])
+                elapsed = time.perf_counter() - started
+        finally:
+            with bind.begin() as connection:
+                connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        recall = np.mean([len(set(found) & set(truth)) / k for found, truth in zip(np.argsort(-(queries @ decoded.T), axis=1)[:, :k], exact)])
+        print(f"{backend.name:>8}: {float(size):>8,.0f} bytes/vector, {count / elapsed:>10,.0f} vectors/s loaded, recall@{k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Embedding storage benchmarks and migrations")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    benchmark_parser = subcommands.add_parser("benchmark")
+    benchmark_parser.add_argument("--count", type=int, default=20_000)
+    migrate_parser = subcommands.add_parser("migrate")
+    migrate_parser.add_argument("target", choices=list(BACKENDS))
+    migrate_parser.add_argument("--source", choices=list(BACKENDS), default=EMBEDDING_STORAGE)
+    args = parser.parse_args()
+
+    from src.backend.services.database import engine
+    if args.command == "benchmark":
+        benchmark(engine, args.count)
+    else:
+        migrate_embeddings(engine, args.target, args.source)
@@ -0,0 +1,47 @@
+import os
+import httpx
+
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", 60))
+GATEWAY_CONNECT_TIMEOUT = float(os.getenv("GATEWAY_CONNECT_TIMEOUT", 5))
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", 100))
+GATEWAY_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GATEWAY_MAX_KEEPALIVE_CONNECTIONS", 20))
+
+try:
+    import h2  # noqa: F401  httpx only negotiates HTTP/2 when h2 is installed
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class GatewayClient:
+    """
+    Shared async HTTP client for the GCP API gateway.
+
+    One pooled httpx.AsyncClient is opened at app startup and closed at
+    shutdown, so concurrent requests reuse keep-alive connections.
+    """
+    def __init__(self, base_url:str, timeout:float=GATEWAY_TIMEOUT, connect_timeout:float=GATEWAY_CONNECT_TIMEOUT,
+                 max_connections:int=GATEWAY_MAX_CONNECTIONS, max_keepalive_connections:int=GATEWAY_MAX_KEEPALIVE_CONNECTIONS):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+        self.client: httpx.AsyncClient | None = None
+
+    async def start(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url or "",
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=HTTP2_AVAILABLE,
+            )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def post(self, path:str, **kwargs) -> httpx.Response:
+        if self.client is None:
+            await self.start()
+        return await self.client.post(path, **kwargs)
@@ -1,4 +1,6 @@
 import os
+import json
+import threading
 from pydantic import BaseModel
 from google import genai
 from google.genai import types
@@ -9,8 +11,10 @@ from numpy import dot
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part
 from vertexai.preview.vision_models import ImageGenerationModel
-from src.backend.services.pydantic_models import Quiz
+from src.backend.services.pydantic_models import Quiz, LLMResponse
 from google.oauth2 import service_account
+from src.backend.services.embedding_cache import EmbeddingCache, get_embedding_cache
+from src.backend.services.llm_cache import LLMCache, get_llm_cache
 
 
 class GeminiModel(Enum):
@@ -19,21 +23,56 @@ class GeminiModel(Enum):
 class GeminiEmbeddingModel(Enum):
     EMBEDDING = "gemini-embedding-exp-03-07"
 
+# Part of every LLM cache key: bump one whenever its prompt changes
+SUMMARY_PROMPT_VERSION = "1"
+QUIZ_PROMPT_VERSION = "1"
+VIDEO_SUMMARY_PROMPT_VERSION = "1"
+VIDEO_SUMMARY_MODEL = "gemini-1.5-flash-002"
+
+
+def _model_name(model) -> str:
+    return getattr(model, "value", str(model))
+
 
 
 class Gemini:
-    def __init__(self, api_key:str, model:GeminiModel, embedding_model:GeminiEmbeddingModel):
+    def __init__(self, api_key:str, model:GeminiModel, embedding_model:GeminiEmbeddingModel, cache:EmbeddingCache=None, llm_cache:LLMCache=None):
         self.model = model
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.llm_cache = llm_cache if llm_cache is not None else get_llm_cache()
         self.embedding_model = embedding_model
         self.api_key = api_key
+        self.credentials = None
         self.client = genai.Client(api_key=self.api_key)
-        self.credentials = service_account.Credentials.from_service_account_file(
-            'service_account.json'
-        )
-        PROJECT_ID = 'genai-genesis-454423'
-        vertexai.init(project=PROJECT_ID, location="us-central1", credentials=self.credentials)
-        self.flash_model = GenerativeModel("gemini-1.5-flash-002")
-        self.image_model = ImageGenerationModel.from_pretrained("imagen-3.0-generate-002")
+        # Vertex AI models are only needed for video summaries and images, so
+        # credentials and model handles are loaded on first use of either
+        self._flash_model = None
+        self._image_model = None
+        self._vertex_lock = threading.Lock()
+
+    def _init_vertex(self):
+        if self.credentials is None:
+            self.credentials = service_account.Credentials.from_service_account_file(
+                'service_account.json'
+            )
+            PROJECT_ID = 'genai-genesis-454423'
+            vertexai.init(project=PROJECT_ID, location="us-central1", credentials=self.credentials)
+
+    @property
+    def flash_model(self) -> GenerativeModel:
+        with self._vertex_lock:
+            if self._flash_model is None:
+                self._init_vertex()
+                self._flash_model = GenerativeModel(VIDEO_SUMMARY_MODEL)
+            return self._flash_model
+
+    @property
+    def image_model(self) -> ImageGenerationModel:
+        with self._vertex_lock:
+            if self._image_model is None:
+                self._init_vertex()
+                self._image_model = ImageGenerationModel.from_pretrained("imagen-3.0-generate-002")
+            return self._image_model
 
     def image_generation(self, desc:str):
         output_file = "input-image.png"
@@ -55,6 +94,10 @@ class Gemini:
         images[0].save(location=output_file, include_generation_parameters=False)
 
     def generate_quiz(self, text:str):
+        model_name = _model_name(GeminiModel.FLASH)
+        cached = self.llm_cache.get("generate_quiz", model_name, QUIZ_PROMPT_VERSION, text)
+        if cached is not None:
+            return LLMResponse(text=cached, parsed=[Quiz(**quiz) for quiz in json.loads(cached)])
         try:
             prompt = f"Generate a multiple choice quiz with 4 questions and a list of the correct answers based on the following text: {text}"
             response = self.client.models.generate_content(
@@ -64,18 +107,32 @@ class Gemini:
                     'response_mime_type': 'application/json',
                     'response_schema': list[Quiz],
             },)
-            return response
         except Exception as e:
             return f"Error during generation: {str(e)}"
+        # Only answers that parsed against the schema are worth serving again
+        if response.parsed is not None:
+            self.llm_cache.put("generate_quiz", model_name, QUIZ_PROMPT_VERSION, text,
+                               value=json.dumps([quiz.model_dump() for quiz in response.parsed]))
+        return LLMResponse(text=response.text, parsed=response.parsed)
 
     def generate_summary(self, text:str):
+        model_name = _model_name(self.model)
+        cached = self.llm_cache.get("generate_summary", model_name, SUMMARY_PROMPT_VERSION, text)
+        if cached is not None:
+            return LLMResponse(text=cached)
         try:
             prompt = f"Summarize the following class notes into concise bullet points: {text}"
-            return self.client.models.generate_content(model=self.model, contents=prompt)
+            response = self.client.models.generate_content(model=self.model, contents=prompt)
         except Exception as e:
             return f"Error during generation: {str(e)}"
+        if response.text:
+            self.llm_cache.put("generate_summary", model_name, SUMMARY_PROMPT_VERSION, text, value=response.text)
+        return LLMResponse(text=response.text)
         
     def summarize_video(self, link:str, type:str):
+        cached = self.llm_cache.get("summarize_video", VIDEO_SUMMARY_MODEL, VIDEO_SUMMARY_PROMPT_VERSION, link, type)
+        if cached is not None:
+            return cached
         contents = [
             # Text prompt
             "Describe this video in a few sentences.",
@@ -85,16 +142,24 @@ class Gemini:
         ]
 
         response = self.flash_model.generate_content(contents)
+        if response.text:
+            self.llm_cache.put("summarize_video", VIDEO_SUMMARY_MODEL, VIDEO_SUMMARY_PROMPT_VERSION, link, type, value=response.text)
         return response.text
 
     def generate_embedding(self, text:str):
         try:
+            model_name = getattr(self.embedding_model, "value", str(self.embedding_model))
+            cached = self.cache.get(model_name, "SEMANTIC_SIMILARITY", text)
+            if cached is not None:
+                return cached
             result = self.client.models.embed_content(
                 model=self.embedding_model,
                 contents=text,
                 config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY")
             )
-            return result.embeddings[0].values
+            embedding = result.embeddings[0].values
+            self.cache.put(model_name, "SEMANTIC_SIMILARITY", text, embedding)
+            return embedding
         except Exception as e:
             return f"Error during generation: {str(e)}"
 
@@ -36,6 +36,49 @@ def sentence_slicer(past_chunk: str, current_chunk: str, next_chunk: str) -> Sen
     return SentenceSlicer.model_validate_json(json_content)
 
 
+class SentenceSlicerBatch(BaseModel):
+    is_sentence_end: list[bool]
+
+
+# Keeps a single batched request comfortably inside the model's context window
+MAX_SLICER_BATCH_SIZE = 200
+
+
+def sentence_slicer_batch(windows: list[tuple[str, str, str]]) -> list[bool]:
+    """Classify many (past, current, next) chunk windows with one request per MAX_SLICER_BATCH_SIZE windows"""
+    decisions = []
+    for offset in range(0, len(windows), MAX_SLICER_BATCH_SIZE):
+        batch = windows[offset:offset + MAX_SLICER_BATCH_SIZE]
+        numbered = "\n".join(
+            f"{i}. Past chunk: {past_chunk} | Current chunk: {current_chunk} | Next chunk: {next_chunk}"
+            for i, (past_chunk, current_chunk, next_chunk) in enumerate(batch)
+        )
+        chat_completion = groq.chat.completions.create(
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a sentence slicer. For each numbered item, decide whether the current chunk is the end of a sentence. "
+                    f"Return one JSON boolean per item, in order, so the array has exactly {len(batch)} entries. Use JSON-compliant boolean values (true/false, not True/False).\n"
+                    f"The JSON object must use the schema: {json.dumps(SentenceSlicerBatch.model_json_schema(), indent=2)}"
+                },
+                {
+                    "role": "user",
+                    "content": numbered,
+                },
+            ],
+            model="llama3-70b-8192",
+            temperature=0,
+            stream=False,
+            response_format={"type": "json_object"},
+        )
+        json_content = chat_completion.choices[0].message.content
+        batch_decisions = SentenceSlicerBatch.model_validate_json(json_content).is_sentence_end
+        # A short or long answer must not shift later decisions onto the wrong windows
+        batch_decisions = (batch_decisions + [False] * len(batch))[:len(batch)]
+        decisions.extend(batch_decisions)
+    return decisions
+
+
 def print_sentence_slicer(sentence_slicer: SentenceSlicer):
     print("Sentence slicer:", sentence_slicer.is_sentence_end)
 
@@ -0,0 +1,468 @@
+import os
+import asyncio
+import shutil
+import tempfile
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from sqlalchemy.orm import Session, sessionmaker
+from src.backend.services.models import Material_Metadata, Ingestion_Job
+from concurrent.futures import ThreadPoolExecutor
+from src.backend.services.ocr_mistral import iter_pages_from_file
+from src.backend.services.cohere_client import MAX_EMBED_BATCH_SIZE, MAX_CONCURRENT_EMBED_BATCHES
+from src.backend.services.material_ingest import bulk_insert_materials, document_text
+from src.backend.services.chunker import iter_chunks
+from src.backend.services.pydantic_models import MaterialChunk
+
+# Where uploads wait for a worker. Deployed services use a gs://bucket/prefix URI
+# so a job can run on any API instance or the batch job; a local directory only
+# works when the API process that accepted the upload also runs the job.
+INGESTION_UPLOAD_DIR = os.getenv("INGESTION_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "athena-ingest"))
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 2))
+# Cloud Run allows 10s between SIGTERM and SIGKILL; jobs still running after this are requeued
+INGESTION_SHUTDOWN_TIMEOUT = float(os.getenv("INGESTION_SHUTDOWN_TIMEOUT_SECONDS", 8))
+# A running job whose row has not changed for this long is assumed lost with its worker and requeued
+INGESTION_STALE_AFTER = timedelta(seconds=int(os.getenv("INGESTION_STALE_SECONDS", 1800)))
+
+# Stages in the order a job moves through them
+STAGES = ["video_summary", "ocr", "embedding", "storing", "summary", "file_url"]
+
+
+class JobReleasedError(Exception):
+    """The job was requeued while this worker was running it, so another worker owns it now"""
+
+
+_storage_client = None
+_storage_client_lock = threading.Lock()
+
+def _get_storage_client():
+    global _storage_client
+    with _storage_client_lock:
+        if _storage_client is None:
+            from google.cloud import storage
+            _storage_client = storage.Client()
+        return _storage_client
+
+
+def _blob(uri:str):
+    bucket, _, name = uri.removeprefix("gs://").partition("/")
+    return _get_storage_client().bucket(bucket).blob(name)
+
+
+def save_upload(file_obj, filename:str) -> str:
+    """Persist an uploaded file where the ingestion workers can read it and return its path or gs:// URI"""
+    suffix = os.path.splitext(filename)[1]
+    if INGESTION_UPLOAD_DIR.startswith("gs://"):
+        uri = f"{INGESTION_UPLOAD_DIR.rstrip('/')}/{uuid.uuid4()}{suffix}"
+        _blob(uri).upload_from_file(file_obj)
+        return uri
+    os.makedirs(INGESTION_UPLOAD_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(delete=False, dir=INGESTION_UPLOAD_DIR, suffix=suffix) as temp_file:
+        shutil.copyfileobj(file_obj, temp_file)
+        return temp_file.name
+
+
+@contextmanager
+def local_upload(file_path:str):
+    """Local path of a saved upload, downloading it for the duration of the block if it is in Cloud Storage"""
+    if not file_path.startswith("gs://"):
+        yield file_path
+        return
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_path)[1]) as temp_file:
+        _blob(file_path).download_to_file(temp_file)
+    try:
+        yield temp_file.name
+    finally:
+        os.unlink(temp_file.name)
+
+
+def remove_upload(file_path:str):
+    if not file_path:
+        return
+    if file_path.startswith("gs://"):
+        from google.api_core.exceptions import NotFound
+        try:
+            _blob(file_path).delete()
+        except NotFound:
+            pass
+    elif os.path.exists(file_path):
+        os.unlink(file_path)
+
+
+def create_job(db:Session, user_id:str, name:str, file_path:str, video_url:str=None) -> Ingestion_Job:
+    job = Ingestion_Job(user_id=user_id, name=name, file_path=file_path, video_url=video_url, status="queued")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_status(job:Ingestion_Job) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "stages": STAGES,
+        # pages_done counts pages through OCR; pages_total is known once OCR finishes
+        "pages_total": job.pages_total,
+        "pages_done": job.pages_done,
+        "doc_id": job.doc_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+class IngestionWorker:
+    """
+    Runs the upload-material pipeline for queued Ingestion_Job rows.
+
+    Every stage transition is committed to the jobs table so the status
+    endpoint can report progress while the job is still running.
+    """
+    def __init__(self, session_factory:sessionmaker, gemini, co_client, get_signed_url:Callable[[str], Awaitable[str]], vector_indexes=None):
+        self.session_factory = session_factory
+        self.gemini = gemini
+        self.co_client = co_client
+        self.get_signed_url = get_signed_url
+        self.vector_indexes = vector_indexes
+
+    async def run(self, job_id:str):
+        """Run a queued job, unless another worker has already claimed it"""
+        claim_id = await asyncio.to_thread(self._claim, job_id)
+        if claim_id is not None:
+            await self._execute(job_id, claim_id)
+
+    async def run_pending(self, limit:int=None) -> int:
+        """Claim and run queued jobs one at a time, as the Cloud Run batch job does"""
+        await asyncio.to_thread(self.requeue_stale)
+        processed = 0
+        while limit is None or processed < limit:
+            claimed = await asyncio.to_thread(self._claim_next)
+            if claimed is None:
+                break
+            await self._execute(*claimed)
+            processed += 1
+        return processed
+
+    async def fail(self, job_id:str, error:str):
+        """Mark a job failed and delete its upload, logging rather than raising if the database is unavailable"""
+        try:
+            await asyncio.to_thread(self._fail, job_id, error)
+        except Exception as e:
+            print(f"Could not mark ingestion job {job_id} failed, it will be requeued once stale: {str(e)}")
+
+    def queued_job_ids(self) -> list[str]:
+        db = self.session_factory()
+        try:
+            return [row.id for row in db.query(Ingestion_Job.id).filter(
+                Ingestion_Job.status == "queued"
+            ).order_by(Ingestion_Job.created_at).all()]
+        finally:
+            db.close()
+
+    def requeue_stale(self, stale_after:timedelta=INGESTION_STALE_AFTER) -> int:
+        """Put running jobs back in the queue once they have gone stale_after without progress"""
+        db = self.session_factory()
+        try:
+            requeued = db.query(Ingestion_Job).filter(
+                Ingestion_Job.status == "running",
+                Ingestion_Job.updated_at < datetime.now() - stale_after
+            ).update({"status": "queued", "stage": None, "claim_id": None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if requeued:
+            print(f"Requeued {requeued} stale ingestion jobs")
+        return requeued
+
+    async def _execute(self, job_id:str, claim_id:str):
+        try:
+            file_path = (await asyncio.to_thread(self._load, job_id)).file_path
+            doc_id = await asyncio.to_thread(self._ingest, job_id, claim_id)
+            await asyncio.to_thread(self._update, job_id, stage="file_url")
+            file_url = await self.get_signed_url(file_path)
+            await asyncio.to_thread(self._finish, job_id, doc_id, file_url)
+        except asyncio.CancelledError:
+            # Shutting down mid-job: hand it back to the queue and keep the upload for the next attempt
+            await asyncio.to_thread(self._release, job_id, claim_id)
+            raise
+        except JobReleasedError as e:
+            print(str(e))
+            return
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {str(e)}")
+            traceback.print_exc()
+            await self.fail(job_id, str(e))
+            return
+        # The upload is only needed until the job reaches a final status
+        remove_upload(file_path)
+
+    def _ingest(self, job_id:str, claim_id:str) -> int:
+        job = self._load(job_id)
+        if job.doc_id is None:
+            self._update(job_id, stage="video_summary")
+            video_summary = None
+            # Only generate video summary if video_url is provided
+            if job.video_url:
+                video_summary = self.gemini.summarize_video(job.video_url, "video/mp4")
+
+            self._update(job_id, stage="ocr")
+            with local_upload(job.file_path) as file_path:
+                page_texts, chunks, embeddings = self._ocr_and_embed(job_id, file_path)
+
+            self._update(job_id, stage="storing")
+            doc_id, material_ids = self._store(job, claim_id, video_summary, chunks, embeddings)
+            if self.vector_indexes is not None:
+                self.vector_indexes.add(job.user_id, "materials", material_ids, embeddings)
+            text = " ".join(page_texts)
+        else:
+            # An earlier attempt stored the chunks before it was interrupted; only the summary is left
+            doc_id = job.doc_id
+            db = self.session_factory()
+            try:
+                text = document_text(db, doc_id)
+            finally:
+                db.close()
+
+        self._update(job_id, stage="summary")
+        summary = self.gemini.generate_summary(text)
+        db = self.session_factory()
+        try:
+            material_metadata = db.get(Material_Metadata, doc_id)
+            material_metadata.summary = str(summary.text)
+            db.commit()
+        finally:
+            db.close()
+        return doc_id
+
+    def _store(self, job:Ingestion_Job, claim_id:str, video_summary:str | None, chunks:list[MaterialChunk], embeddings:list[list[float]]) -> tuple[int, list[int]]:
+        """Insert the document and its chunks and record doc_id on the job in one transaction"""
+        db = self.session_factory()
+        try:
+            claimed = db.query(Ingestion_Job).filter(
+                Ingestion_Job.id == job.id,
+                Ingestion_Job.claim_id == claim_id
+            ).with_for_update().first()
+            if claimed is None:
+                raise JobReleasedError(f"Ingestion job {job.id} was requeued while running, discarding this attempt")
+            material_metadata = Material_Metadata(
+                video_url=job.video_url,
+                video_summary=video_summary,
+                name=job.name,
+                user_id=job.user_id
+            )
+            db.add(material_metadata)
+            db.flush()
+            material_ids = bulk_insert_materials(db, material_metadata.id, chunks, embeddings)
+            claimed.doc_id = material_metadata.id
+            db.commit()
+            return material_metadata.id, material_ids
+        finally:
+            db.close()
+
+    def _ocr_and_embed(self, job_id:str, file_path:str) -> tuple[list[str], list[MaterialChunk], list[list[float]]]:
+        """Chunk pages as OCR yields them and embed full batches of chunks while later PDF shards are still being OCR'd"""
+        page_texts = []
+        chunks = []
+        batch = []
+        embedding_futures = []
+
+        def pages():
+            for page in iter_pages_from_file(file_path):
+                page_texts.append(page.markdown)
+                yield page
+
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EMBED_BATCHES) as executor:
+            for chunk in iter_chunks(pages()):
+                chunks.append(chunk)
+                batch.append(chunk.text)
+                if len(batch) == MAX_EMBED_BATCH_SIZE:
+                    embedding_futures.append(executor.submit(self.co_client.embed_batch, batch))
+                    batch = []
+                    self._update(job_id, pages_done=len(page_texts))
+            if batch:
+                embedding_futures.append(executor.submit(self.co_client.embed_batch, batch))
+            self._update(job_id, stage="embedding", pages_done=len(page_texts), pages_total=len(page_texts))
+            embeddings = [embedding for future in embedding_futures for embedding in future.result()]
+        return page_texts, chunks, embeddings
+
+    def _finish(self, job_id:str, doc_id:int, file_url:str):
+        db = self.session_factory()
+        try:
+            material_metadata = db.get(Material_Metadata, doc_id)
+            material_metadata.file_url = file_url
+            db.commit()
+        finally:
+            db.close()
+        self._update(job_id, status="succeeded", stage=None)
+
+    def _claim(self, job_id:str) -> str | None:
+        claim_id = str(uuid.uuid4())
+        db = self.session_factory()
+        try:
+            claimed = db.query(Ingestion_Job).filter(
+                Ingestion_Job.id == job_id,
+                Ingestion_Job.status == "queued"
+            ).update({"status": "running", "claim_id": claim_id})
+            db.commit()
+            return claim_id if claimed == 1 else None
+        finally:
+            db.close()
+
+    def _claim_next(self) -> tuple[str, str] | None:
+        db = self.session_factory()
+        try:
+            job = db.query(Ingestion_Job).filter(
+                Ingestion_Job.status == "queued"
+            ).order_by(Ingestion_Job.created_at).with_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = "running"
+            job.claim_id = str(uuid.uuid4())
+            db.commit()
+            return job.id, job.claim_id
+        finally:
+            db.close()
+
+    def _release(self, job_id:str, claim_id:str):
+        db = self.session_factory()
+        try:
+            db.query(Ingestion_Job).filter(
+                Ingestion_Job.id == job_id,
+                Ingestion_Job.claim_id == claim_id,
+                Ingestion_Job.status == "running"
+            ).update({"status": "queued", "stage": None, "claim_id": None})
+            db.commit()
+        finally:
+            db.close()
+
+    def _fail(self, job_id:str, error:str):
+        job = self._update(job_id, status="failed", error=error)
+        remove_upload(job.file_path)
+
+    def _load(self, job_id:str) -> Ingestion_Job:
+        db = self.session_factory()
+        try:
+            job = db.get(Ingestion_Job, job_id)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _update(self, job_id:str, **fields) -> Ingestion_Job:
+        db = self.session_factory()
+        try:
+            job = db.get(Ingestion_Job, job_id)
+            for field, value in fields.items():
+                setattr(job, field, value)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+
+class IngestionQueue:
+    """In-process queue feeding a fixed number of IngestionWorker tasks"""
+    def __init__(self, worker:IngestionWorker, concurrency:int=INGESTION_WORKERS, shutdown_timeout:float=INGESTION_SHUTDOWN_TIMEOUT):
+        self.worker = worker
+        self.concurrency = concurrency
+        self.shutdown_timeout = shutdown_timeout
+        self.queue: asyncio.Queue | None = None
+        self.tasks: list[asyncio.Task] = []
+        self.busy: set[asyncio.Task] = set()
+        self.recovery: asyncio.Task | None = None
+        self.stopping = False
+
+    async def start(self):
+        """Start the consumers; jobs left over from earlier runs are recovered in the background"""
+        self.queue = asyncio.Queue()
+        self.stopping = False
+        self.tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        # Recovery takes database round trips, which would otherwise delay the first request
+        self.recovery = asyncio.create_task(self._recover())
+
+    async def stop(self):
+        """Give running jobs shutdown_timeout seconds to finish, then cancel them back to queued"""
+        self.stopping = True
+        if self.recovery is not None:
+            self.recovery.cancel()
+            await asyncio.gather(self.recovery, return_exceptions=True)
+            self.recovery = None
+        running = [task for task in self.tasks if task in self.busy]
+        for task in self.tasks:
+            if task not in self.busy:
+                task.cancel()
+        if running:
+            _, unfinished = await asyncio.wait(running, timeout=self.shutdown_timeout)
+            for task in unfinished:
+                task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def submit(self, job_id:str):
+        await self.queue.put(job_id)
+
+    async def _recover(self):
+        """Enqueue jobs accepted before the last restart, and jobs whose worker died mid-run"""
+        try:
+            await asyncio.to_thread(self.worker.requeue_stale)
+            for job_id in await asyncio.to_thread(self.worker.queued_job_ids):
+                await self.submit(job_id)
+        except Exception as e:
+            # Left queued in the database, so the next start or the batch job picks them up
+            print(f"Failed to recover queued ingestion jobs: {str(e)}")
+            traceback.print_exc()
+
+    async def _consume(self):
+        task = asyncio.current_task()
+        while not self.stopping:
+            job_id = await self.queue.get()
+            self.busy.add(task)
+            try:
+                await self.worker.run(job_id)
+            except Exception as e:
+                # Errors outside the job's own handling, such as the claim query failing, must not kill the consumer
+                print(f"Ingestion worker error on job {job_id}: {str(e)}")
+                traceback.print_exc()
+                await self.worker.fail(job_id, str(e))
+            finally:
+                self.busy.discard(task)
+                self.queue.task_done()
+
+
+if __name__ == "__main__":
+    # Batch entry point used by job.yaml: drain every queued job, then exit
+    from src.backend.services.database import SessionLocal
+    from src.backend.services.gemini_client import Gemini, GeminiModel, GeminiEmbeddingModel
+    from src.backend.services.cohere_client import Cohere
+    from src.backend.services.gateway_client import GatewayClient
+
+    async def main():
+        gateway = GatewayClient(os.getenv("GCP_GATEWAY"))
+        await gateway.start()
+
+        async def get_signed_url(filename:str) -> str:
+            response = await gateway.post("/v1/cloudstore/storage-post", json={"filename": filename})
+            if response.status_code != 200:
+                raise Exception(f"Failed to get signed URL: {response.text}")
+            return response.json()["upload_url"]
+
+        worker = IngestionWorker(
+            SessionLocal,
+            Gemini(os.getenv('GEMINI_API_KEY'), GeminiModel.FLASH, GeminiEmbeddingModel.EMBEDDING),
+            Cohere(os.getenv('COHERE_API_KEY')),
+            get_signed_url,
+        )
+        try:
+            processed = await worker.run_pending()
+            print(f"Processed {processed} ingestion jobs")
+        finally:
+            await gateway.close()
+
+    asyncio.run(main())
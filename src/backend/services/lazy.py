@@ -0,0 +1,43 @@
+import threading
+import time
+from typing import Callable
+
+
+class Lazy:
+    """
+    Proxy that builds a provider client on first attribute access.
+
+    Call sites keep using the proxy as if it were the client; the factory runs
+    once, under a lock, either on the first request that needs it or when
+    warm() is called from a startup hook.
+    """
+    def __init__(self, factory:Callable, name:str=None):
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", "service")
+        self._instance = None
+        self._lock = threading.Lock()
+        self.build_seconds = None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self._factory()
+                    self.build_seconds = time.perf_counter() - started
+                    print(f"Initialised {self._name} in {self.build_seconds:.2f}s")
+        return self._instance
+
+    def warm(self):
+        try:
+            self.get()
+        except Exception as e:
+            # A failed warm-up is retried by the first request that needs the client
+            print(f"Warm-up of {self._name} failed: {e}")
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
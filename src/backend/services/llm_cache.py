@@ -0,0 +1,92 @@
+import os
+import time
+import sqlite3
+import threading
+from src.backend.services.embedding_cache import LRUCache, cache_key
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "src/backend/services/cache/llm_responses.db")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 2048))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+# Expired rows are purged from SQLite once every this many writes
+PURGE_INTERVAL = 256
+
+
+class LLMCache:
+    """
+    Two-tier cache of LLM outputs keyed by (model, method, prompt version, sha256(inputs)).
+
+    Bumping a method's prompt version changes every key it produces, so
+    answers generated from an old prompt are never served. Entries older
+    than the TTL are treated as misses and purged from SQLite.
+    """
+    def __init__(self, path:str=LLM_CACHE_PATH, max_size:int=LLM_CACHE_SIZE, ttl:int=LLM_CACHE_TTL):
+        self.memory = LRUCache(max_size)
+        self.path = path
+        self.ttl = ttl
+        self.counts: dict[str, dict[str, int]] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses (key TEXT PRIMARY KEY, method TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, method:str, model:str, prompt_version:str, *inputs:str) -> str | None:
+        key = cache_key(model, method, prompt_version, *inputs)
+        entry = self.memory.get(key)
+        if entry is not None and not self._expired(entry[0]):
+            self._count(method, "memory_hits")
+            return entry[1]
+        with self._lock:
+            row = self._conn.execute("SELECT created_at, value FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and not self._expired(row[0]):
+            self.memory.put(key, row)
+            self._count(method, "disk_hits")
+            return row[1]
+        self._count(method, "misses")
+        return None
+
+    def put(self, method:str, model:str, prompt_version:str, *inputs:str, value:str):
+        key = cache_key(model, method, prompt_version, *inputs)
+        created_at = time.time()
+        self.memory.put(key, (created_at, value))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, method, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, method, value, created_at),
+            )
+            self._writes += 1
+            if self._writes % PURGE_INTERVAL == 0:
+                self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (created_at - self.ttl,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            methods = {}
+            for method, counts in self.counts.items():
+                lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+                methods[method] = {**counts, "hit_rate": (lookups - counts["misses"]) / lookups if lookups else 0.0}
+            return {"methods": methods, "memory_entries": len(self.memory)}
+
+    def _expired(self, created_at:float) -> bool:
+        return time.time() - created_at > self.ttl
+
+    def _count(self, method:str, outcome:str):
+        with self._lock:
+            counts = self.counts.setdefault(method, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMCache:
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache()
+        return _shared_cache
@@ -0,0 +1,94 @@
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from src.backend.services.models import Material
+from src.backend.services.pydantic_models import MaterialChunk
+from src.backend.services.chunker import PAGE_SEPARATOR
+
+
+def bulk_insert_materials(db:Session, doc_id:int, chunks:list[MaterialChunk], embeddings:list[list[float]]) -> list[int]:
+    """
+    Insert one Material row per chunk in a single executemany round trip.
+
+    Each row stores its chunk's text and page/offset provenance. The caller
+    owns the transaction, so the rows become visible together when it commits.
+    """
+    if not chunks:
+        return []
+    rows = [
+        {
+            "text": chunk.text,
+            "doc_id": doc_id,
+            "chunk_id": i,
+            "page_start": chunk.page_start,
+            "char_start": chunk.char_start,
+            "page_end": chunk.page_end,
+            "char_end": chunk.char_end,
+            "overlap_chars": chunk.overlap_chars,
+            "embedding": embedding,
+        }
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    ]
+    return list(db.scalars(insert(Material).returning(Material.id), rows).all())
+
+
+def join_chunks(chunks:list) -> str:
+    """
+    Concatenate chunks, in chunk_id order, back into their document's text.
+
+    Chunks from iter_chunks tile the document, so each contributes its text
+    past overlap_chars and the result is exact. Rows stored before chunks
+    tiled skipped the whitespace between them; their offsets show the gap,
+    which is filled with a space, or PAGE_SEPARATOR across pages.
+    """
+    parts = []
+    previous_end = None
+    for chunk in chunks:
+        if not chunk.text:
+            continue
+        start = (chunk.page_start, chunk.char_start)
+        if previous_end is not None and not chunk.overlap_chars and start != previous_end:
+            across_pages = None not in (chunk.page_start, previous_end[0]) and chunk.page_start != previous_end[0]
+            parts.append(PAGE_SEPARATOR if across_pages else " ")
+        parts.append(chunk.text[chunk.overlap_chars or 0:])
+        previous_end = (chunk.page_end, chunk.char_end)
+    return "".join(parts)
+
+
+def document_text(db:Session, doc_id:int) -> str:
+    """Reassemble a document's full text from its chunks"""
+    rows = db.execute(
+        select(Material.text, Material.page_start, Material.char_start, Material.page_end, Material.char_end, Material.overlap_chars)
+        .filter(Material.doc_id == doc_id).order_by(Material.chunk_id)
+    ).all()
+    return join_chunks(rows)
+
+
+if __name__ == "__main__":
+    import random
+    import time
+    from src.backend.services.models import Material_Metadata, Users
+    from src.backend.services.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        # Everything below is rolled back, so the benchmark leaves no rows behind
+        user = Users(id="bulk-insert-benchmark")
+        db.add(user)
+        db.flush()
+        for page_count in (10, 100, 300, 1000):
+            material_metadata = Material_Metadata(name=f"benchmark-{page_count}", user_id=user.id)
+            db.add(material_metadata)
+            db.flush()
+            chunks = [
+                MaterialChunk(text=f"page {i} " + "lorem ipsum " * 250, page_start=i, char_start=0, page_end=i, char_end=3007, token_count=400)
+                for i in range(page_count)
+            ]
+            embeddings = [[random.random() for _ in range(1024)] for _ in range(page_count)]
+            start = time.perf_counter()
+            bulk_insert_materials(db, material_metadata.id, chunks, embeddings)
+            db.flush()
+            elapsed = time.perf_counter() - start
+            print(f"{page_count} pages: {elapsed:.3f}s ({page_count / elapsed:.0f} rows/s)")
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,72 @@
+from sqlalchemy import inspect, text
+from src.backend.services.models import Base
+from src.backend.services.database import engine
+from src.backend.services.embedding_storage import ensure_extension
+
+# Kept out of the API's import path: reflecting the schema costs several round
+# trips to the database, which used to land on every cold start.
+TABLES = [
+    'materials',
+    'material_metadata',
+    'video_metadata',
+    'video_transcript',
+    'questions',
+    'courses',
+    'users',
+    'ingestion_jobs',
+    'transcript_cache'
+]
+
+
+def missing_tables(bind=engine) -> list[str]:
+    inspector = inspect(bind)
+    return [table for table in TABLES if not inspector.has_table(table)]
+
+
+def ensure_columns(bind=engine) -> list[str]:
+    """Add nullable columns added to the models after their tables already existed"""
+    inspector = inspect(bind)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                print(f"Adding column {column.name} to {table.name}")
+                with bind.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def ensure_indexes(bind=engine) -> list[str]:
+    """Create indexes added to the models after their tables already existed"""
+    inspector = inspect(bind)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                print(f"Creating index {index.name} on {table.name}")
+                index.create(bind=bind)
+                created.append(index.name)
+    return created
+
+
+def migrate(bind=engine) -> list[str]:
+    """Create any tables, nullable columns and indexes the models define that the database does not have yet"""
+    tables_missing = missing_tables(bind)
+    if tables_missing:
+        ensure_extension(bind)
+        print(f"Creating missing tables: {', '.join(tables_missing)}")
+        Base.metadata.create_all(bind=bind)
+    else:
+        print("All database tables already exist, skipping creation.")
+    ensure_columns(bind)
+    ensure_indexes(bind)
+    return tables_missing
+
+
+if __name__ == "__main__":
+    migrate()
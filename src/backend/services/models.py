@@ -1,30 +1,15 @@
-import os
 from datetime import datetime
-from dotenv import load_dotenv
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, Boolean,
-    DateTime, ForeignKey, ARRAY
+    Column, Integer, String, Float, Boolean,
+    DateTime, ForeignKey, ARRAY, JSON, Index
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
+from src.backend.services.database import engine
+from src.backend.services.embedding_storage import embedding_column_type
 
-# Load environment variables
-load_dotenv()
-
-# Read from .env
-
-# Create the connection URL
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT", 6543)  # Default to 6543 if not specified
-DB_NAME = os.getenv("DB_NAME")
-
-# Create the connection URL
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
 # Base model
 Base = declarative_base()
 
@@ -35,8 +20,14 @@ class Material(Base):
     text = Column(String, nullable=True)
     doc_id = Column(ForeignKey('material_metadata.id'), nullable=False)
     chunk_id = Column(Integer, nullable=False)
+    # Provenance of a token chunk within the uploaded document; NULL for rows stored one per page
+    page_start = Column(Integer, nullable=True)
+    char_start = Column(Integer, nullable=True)
+    page_end = Column(Integer, nullable=True)
+    char_end = Column(Integer, nullable=True)
+    overlap_chars = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
-    embedding = Column(ARRAY(Float), nullable=False)
+    embedding = Column(embedding_column_type(), nullable=False)
 
 class Material_Metadata(Base):
     __tablename__ = 'material_metadata'
@@ -48,6 +39,8 @@ class Material_Metadata(Base):
     file_url = Column(String, nullable=True)
     user_id = Column(ForeignKey('users.id'), nullable=False)
     summary = Column(String, nullable=True)
+    # Keyset pagination of a user's notes, newest first
+    __table_args__ = (Index('ix_material_metadata_user_created', 'user_id', 'created_at', 'id'),)
 
 class Video_Metadata(Base):
     __tablename__ = 'video_metadata'
@@ -58,6 +51,8 @@ class Video_Metadata(Base):
     video_summary = Column(String, nullable=True)
     video_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
+    # Keyset pagination of a user's videos, newest first
+    __table_args__ = (Index('ix_video_metadata_user_created', 'user_id', 'created_at', 'id'),)
 
 class Video_Transcript(Base):
     __tablename__ = 'video_transcript'
@@ -68,7 +63,14 @@ class Video_Transcript(Base):
     end_time = Column(Float, nullable=False)
     text = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
-    embedding = Column(ARRAY(Float), nullable=False)
+    embedding = Column(embedding_column_type(), nullable=False)
+
+class Transcript_Cache(Base):
+    __tablename__ = 'transcript_cache'
+    video_id = Column(String, primary_key=True)  # YouTube video id
+    language = Column(String, primary_key=True)
+    snippets = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime, default=datetime.now, nullable=False)
 
 class Questions(Base):
     __tablename__ = 'questions'
@@ -86,6 +88,24 @@ class Course(Base):
     name = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
 
+class Ingestion_Job(Base):
+    __tablename__ = 'ingestion_jobs'
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(ForeignKey('users.id'), nullable=False)
+    name = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    video_url = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    # Set by the worker that claimed the job; a requeue clears it so a worker that lost the job cannot store its results
+    claim_id = Column(String, nullable=True)
+    stage = Column(String, nullable=True)
+    pages_total = Column(Integer, nullable=True)
+    pages_done = Column(Integer, nullable=False, default=0)
+    doc_id = Column(ForeignKey('material_metadata.id'), nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
 class Users(Base):
     __tablename__ = 'users'
     id = Column(String, primary_key=True)
@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+import time
+import sqlite3
+import threading
+from src.backend.services.pydantic_models import OCRPage, OCRResult
+from src.backend.services.embedding_cache import trim_sqlite_cache, ensure_last_used
+
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "src/backend/services/cache/ocr.db")
+# Cloud Run's filesystem is in memory, so the file is trimmed least recently used first past this size
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+
+def file_sha256(file_path:str, chunk_size:int=1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    Persistent per-page OCR markdown keyed by (OCR model, SHA-256 of the file).
+
+    Identical uploads, whoever sends them, are served from disk instead of
+    being re-uploaded to and re-processed by Mistral. The least recently
+    used documents are evicted once the file passes max_bytes.
+    """
+    def __init__(self, path:str=OCR_CACHE_PATH, max_bytes:int=OCR_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.pages_saved = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_pages (model TEXT NOT NULL, sha256 TEXT NOT NULL, pages TEXT NOT NULL, "
+            "last_used REAL NOT NULL DEFAULT 0, PRIMARY KEY (model, sha256))"
+        )
+        ensure_last_used(self._conn, "ocr_pages")
+        self._conn.commit()
+
+    def get(self, model:str, sha256:str, file_size:int=0) -> OCRResult | None:
+        with self._lock:
+            row = self._conn.execute("SELECT pages FROM ocr_pages WHERE model = ? AND sha256 = ?", (model, sha256)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE ocr_pages SET last_used = ? WHERE model = ? AND sha256 = ?", (time.time(), model, sha256))
+            self._conn.commit()
+            pages = [OCRPage(index=i, markdown=markdown) for i, markdown in enumerate(json.loads(row[0]))]
+            self.hits += 1
+            self.bytes_saved += file_size
+            self.pages_saved += len(pages)
+            return OCRResult(pages=pages)
+
+    def put(self, model:str, sha256:str, pages:list[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_pages (model, sha256, pages, last_used) VALUES (?, ?, ?, ?)",
+                (model, sha256, json.dumps(pages), time.time())
+            )
+            # Documents are written rarely and can be megabytes each, so every write is checked
+            trim_sqlite_cache(self._conn, "ocr_pages", "LENGTH(pages)", self.max_bytes)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "pages_saved": self.pages_saved,
+        }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_ocr_cache() -> OCRCache:
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = OCRCache()
+        return _shared_cache
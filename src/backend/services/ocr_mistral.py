@@ -1,66 +1,243 @@
+import io
 import os
+import time
 import base64
+import threading
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from mistralai import Mistral
+from pypdf import PdfReader
+from PIL import Image, ImageOps
+from src.backend.services.pydantic_models import OCRPage
+from src.backend.services.ocr_cache import get_ocr_cache, file_sha256
 
 # Load API key from environment
 api_key = os.getenv("MISTRAL_API_KEY")
 client = Mistral(api_key=api_key)
+OCR_MODEL = "mistral-ocr-latest"
+OCR_SHARD_PAGES = int(os.getenv("OCR_SHARD_PAGES", 8))
+OCR_PARALLELISM = int(os.getenv("OCR_PARALLELISM", 4))
+OCR_SHARD_RETRIES = int(os.getenv("OCR_SHARD_RETRIES", 3))
+OCR_USE_TEXT_LAYER = os.getenv("OCR_USE_TEXT_LAYER", "true").lower() == "true"
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", 80))
+# Longest image side sent to OCR; phone photos are downscaled to this
+OCR_MAX_IMAGE_SIDE = int(os.getenv("OCR_MAX_IMAGE_SIDE", 2048))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", 85))
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".webp"]
+# Where PDF pages were read from since startup: local text layer or remote OCR
+_page_sources = {"local": 0, "remote": 0}
+_page_sources_lock = threading.Lock()
+
+def _count_page_sources(local: int, remote: int):
+    with _page_sources_lock:
+        _page_sources["local"] += local
+        _page_sources["remote"] += remote
+
+def page_source_stats() -> dict:
+    with _page_sources_lock:
+        return dict(_page_sources)
 
 def encode_file_to_base64(file_path):
-    """Encode any file to base64."""
+    """Encode any file, or binary file object, to base64."""
     try:
-        with open(file_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        f = open(file_path, "rb") if isinstance(file_path, (str, os.PathLike)) else file_path
+        try:
+            return base64.b64encode(f.read()).decode("ascii")
+        finally:
+            f.close()
     except Exception as e:
         return f"Error encoding file: {e}"
 
-def extract_text_from_file(file_path: str) -> str:
-    ext = os.path.splitext(file_path)[-1].lower()
+def preprocess_image(file_path: str, max_side: int = OCR_MAX_IMAGE_SIDE, quality: int = OCR_JPEG_QUALITY) -> tuple[io.BufferedIOBase, str]:
+    """
+    Downscale an image to OCR resolution and re-encode it compactly.
 
-    try:
-        if ext in [".jpg", ".jpeg", ".png"]:
-            # Handle image
-            base64_image = encode_file_to_base64(file_path)
-            if base64_image.startswith("Error"):
-                return base64_image
+    Returns a binary file object positioned at the start and its MIME type.
+    Images already within bounds are passed through untouched.
+    """
+    with Image.open(file_path) as image:
+        source_format = image.format
+        needs_resize = max(image.size) > max_side
+        if not needs_resize and source_format in ("JPEG", "PNG", "WEBP"):
+            return open(file_path, "rb"), Image.MIME[source_format]
+
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        # Screenshots and scans with transparency keep PNG; photos become JPEG
+        if image.mode in ("RGBA", "LA", "P") and source_format == "PNG":
+            image.save(buffer, format="PNG", optimize=True)
+            mime = "image/png"
+        else:
+            image.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+            mime = "image/jpeg"
+    buffer.seek(0)
+    return buffer, mime
 
+def _ocr_image(file_path: str) -> list[OCRPage]:
+    image_file, mime = preprocess_image(file_path)
+    base64_image = encode_file_to_base64(image_file)
+    if base64_image.startswith("Error"):
+        raise Exception(base64_image)
+    ocr_response = client.ocr.process(
+        model=OCR_MODEL,
+        document={
+            "type": "image_url",
+            "image_url": f"data:{mime};base64,{base64_image}"
+        }
+    )
+    return [OCRPage(index=i, markdown=page.markdown) for i, page in enumerate(ocr_response.pages)]
+
+def _upload_pdf(file_path: str):
+    with open(file_path, "rb") as f:
+        uploaded_pdf = client.files.upload(
+            file={
+                "file_name": os.path.basename(file_path),
+                "content": f
+            },
+            purpose="ocr"
+        )
+    return client.files.get_signed_url(file_id=uploaded_pdf.id)
+
+def _ocr_pdf_shard(document_url: str, page_numbers: list[int], retries: int) -> list[OCRPage]:
+    """OCR one page range of an uploaded PDF, retrying only this shard on failure"""
+    for attempt in range(retries + 1):
+        try:
             ocr_response = client.ocr.process(
-                model="mistral-ocr-latest",
+                model=OCR_MODEL,
                 document={
-                    "type": "image_url",
-                    "image_url": f"data:image/jpeg;base64,{base64_image}"
-                }
-            )
-
-        elif ext == ".pdf":
-            # Handle PDF
-            uploaded_pdf = client.files.upload(
-                file={
-                    "file_name": os.path.basename(file_path),
-                    "content": open(file_path, "rb")
+                    "type": "document_url",
+                    "document_url": document_url
                 },
-                purpose="ocr"
+                pages=page_numbers
             )
+            # Pair by position so page numbers stay absolute within the document
+            return [OCRPage(index=page_number, markdown=page.markdown) for page_number, page in zip(page_numbers, ocr_response.pages)]
+        except Exception as e:
+            if attempt == retries:
+                raise
+            print(f"OCR of pages {page_numbers[0]}-{page_numbers[-1]} failed ({e}), retrying")
+            time.sleep(2 ** attempt)
 
-            signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
-
+def _ocr_whole_pdf(file_path: str, retries: int) -> list[OCRPage]:
+    """OCR an entire PDF in one request, for files pypdf cannot open"""
+    signed_url = _upload_pdf(file_path)
+    for attempt in range(retries + 1):
+        try:
             ocr_response = client.ocr.process(
-                model="mistral-ocr-latest",
+                model=OCR_MODEL,
                 document={
                     "type": "document_url",
                     "document_url": signed_url.url
                 }
             )
-        else:
-            return f"Unsupported file type: {ext}"
+            return [OCRPage(index=i, markdown=page.markdown) for i, page in enumerate(ocr_response.pages)]
+        except Exception as e:
+            if attempt == retries:
+                raise
+            print(f"OCR of {os.path.basename(file_path)} failed ({e}), retrying")
+            time.sleep(2 ** attempt)
 
-        # Try extracting the markdown text
-        if hasattr(ocr_response, "markdown_text"):
-            return ocr_response.markdown_text
-        elif isinstance(ocr_response, dict) and "markdown_text" in ocr_response:
-            return ocr_response["markdown_text"]
-        else:
-            return ocr_response
+def local_page_text(page, min_chars: int = OCR_MIN_TEXT_CHARS) -> str | None:
+    """
+    Return a pypdf page's embedded text if it is usable as-is, else None.
 
-    except Exception as e:
-        return f"Error during OCR: {str(e)}"
+    Born-digital pages carry a clean text layer; scanned or image-only pages
+    have none, or only a few stray glyphs, and need remote OCR.
+    """
+    try:
+        text = page.extract_text() or ""
+    except Exception:
+        return None
+    stripped = "".join(text.split())
+    if len(stripped) < min_chars:
+        return None
+    # Broken font encodings extract as replacement or control characters
+    readable = sum(1 for char in stripped if char.isprintable() and char != "\ufffd")
+    if readable / len(stripped) < 0.9:
+        return None
+    return text.strip()
+
+def iter_pdf_pages(file_path: str, shard_pages: int = OCR_SHARD_PAGES, parallelism: int = OCR_PARALLELISM, retries: int = OCR_SHARD_RETRIES, use_text_layer: bool = OCR_USE_TEXT_LAYER) -> Iterator[OCRPage]:
+    """
+    OCR a PDF as concurrent page-range shards and yield its pages in order.
+
+    Pages with a usable text layer are extracted locally; only the rest are
+    uploaded. At most `parallelism` shards are in flight, and each page is
+    yielded as soon as every page before it is available. PDFs pypdf cannot
+    read (encrypted or malformed) are sent to Mistral whole, as is every PDF
+    when neither the text layer nor sharding is enabled.
+    """
+    reader = None
+    if use_text_layer or shard_pages > 0:
+        try:
+            reader = PdfReader(file_path)
+            page_count = len(reader.pages)
+        except Exception as e:
+            print(f"pypdf could not read {os.path.basename(file_path)} ({e}), OCRing the whole document")
+            reader = None
+    if reader is None:
+        pages = _ocr_whole_pdf(file_path, retries)
+        _count_page_sources(0, len(pages))
+        yield from pages
+        return
+
+    local_pages = {}
+    if use_text_layer:
+        for page_number, page in enumerate(reader.pages):
+            text = local_page_text(page)
+            if text is not None:
+                local_pages[page_number] = text
+    remote_page_numbers = [page_number for page_number in range(page_count) if page_number not in local_pages]
+    _count_page_sources(len(local_pages), len(remote_page_numbers))
+
+    shard_size = shard_pages if shard_pages > 0 else max(len(remote_page_numbers), 1)
+    shards = [remote_page_numbers[i:i + shard_size] for i in range(0, len(remote_page_numbers), shard_size)]
+    if not shards:
+        for page_number in range(page_count):
+            yield OCRPage(index=page_number, markdown=local_pages[page_number])
+        return
+
+    signed_url = _upload_pdf(file_path)
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(shards)))) as executor:
+        futures = [executor.submit(_ocr_pdf_shard, signed_url.url, shard, retries) for shard in shards]
+        shard_of_page = {page_number: shard_id for shard_id, shard in enumerate(shards) for page_number in shard}
+        remote_pages = {}
+        try:
+            for page_number in range(page_count):
+                if page_number in local_pages:
+                    yield OCRPage(index=page_number, markdown=local_pages[page_number])
+                    continue
+                if page_number not in remote_pages:
+                    remote_pages.update((page.index, page) for page in futures[shard_of_page[page_number]].result())
+                yield remote_pages.pop(page_number)
+        finally:
+            for future in futures:
+                future.cancel()
+
+def iter_pages_from_file(file_path: str) -> Iterator[OCRPage]:
+    """
+    Yield OCR pages of a PDF or image in order, streaming large PDFs shard by
+    shard and filling the OCR cache. This is the only OCR entry point, so every
+    upload shares one cache key per file.
+    """
+    cache = get_ocr_cache()
+    sha256 = file_sha256(file_path)
+    # Text-layer pages differ from Mistral's markdown, so they are cached separately
+    cache_model = f"{OCR_MODEL}+text-layer" if OCR_USE_TEXT_LAYER else OCR_MODEL
+    cached = cache.get(cache_model, sha256, os.path.getsize(file_path))
+    if cached is not None:
+        yield from cached.pages
+        return
+    ext = os.path.splitext(file_path)[-1].lower()
+    if ext == ".pdf":
+        pages = []
+        for page in iter_pdf_pages(file_path):
+            pages.append(page)
+            yield page
+    elif ext in IMAGE_EXTENSIONS:
+        pages = _ocr_image(file_path)
+        yield from pages
+    else:
+        raise Exception(f"Unsupported file type: {ext}")
+    cache.put(cache_model, sha256, [page.markdown for page in pages])
@@ -0,0 +1,137 @@
+import os
+import json
+import random
+import subprocess
+import threading
+from pydantic import BaseModel
+from src.backend.services.render_engine import probe, RENDER_WIDTH
+
+OVERLAY_SOURCE_DIR = os.getenv("OVERLAY_SOURCE_DIR", "src/backend/services/downloads")
+OVERLAY_LIBRARY_DIR = os.getenv("OVERLAY_LIBRARY_DIR", "src/backend/services/overlays")
+OVERLAY_FPS = int(os.getenv("OVERLAY_FPS", 30))
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm")
+
+
+class OverlayClip(BaseModel):
+    path: str
+    source: str
+    source_mtime: float
+    source_size: int
+    duration: float
+    width: int
+    height: int
+    fps: int
+
+
+class OverlayLibrary:
+    """
+    Overlay ("brainrot") clips pre-transcoded once to the render resolution.
+
+    Each clip is scaled to the render width, resampled to a fixed fps, stripped
+    of audio and encoded as H.264 with frequent keyframes, so renders can use it
+    without rescaling. manifest.json records every clip's source and probe
+    results; selection reads only the in-memory manifest. Transcoding is slow,
+    so build() runs at deploy time (`python -m src.backend.services.overlay_library`),
+    never on the request path.
+    """
+    def __init__(self, source_dir:str=OVERLAY_SOURCE_DIR, library_dir:str=OVERLAY_LIBRARY_DIR, width:int=RENDER_WIDTH, fps:int=OVERLAY_FPS):
+        self.source_dir = source_dir
+        self.library_dir = library_dir
+        self.width = width
+        self.fps = fps
+        self.manifest_path = os.path.join(library_dir, "manifest.json")
+        self.clips: dict[str, OverlayClip] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                clips = [OverlayClip(**clip) for clip in json.load(f)]
+            self.clips = {clip.path: clip for clip in clips if os.path.exists(clip.path) and clip.width == self.width}
+
+    def build(self) -> list[OverlayClip]:
+        """Transcode new or changed source clips and rewrite the manifest"""
+        os.makedirs(self.library_dir, exist_ok=True)
+        by_source = {clip.source: clip for clip in self.clips.values()}
+        clips = []
+        for filename in sorted(os.listdir(self.source_dir)):
+            if not filename.lower().endswith(VIDEO_EXTENSIONS):
+                continue
+            source = os.path.join(self.source_dir, filename)
+            stat = os.stat(source)
+            existing = by_source.get(source)
+            if existing and existing.source_mtime == stat.st_mtime and existing.source_size == stat.st_size:
+                clips.append(existing)
+                continue
+            clips.append(self._transcode(source, stat))
+        with self._lock:
+            self.clips = {clip.path: clip for clip in clips}
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump([clip.model_dump() for clip in clips], f, indent=2)
+        return clips
+
+    def choose(self) -> OverlayClip | None:
+        with self._lock:
+            if not self.clips:
+                return None
+            return random.choice(list(self.clips.values()))
+
+    def choose_path(self) -> str | None:
+        """A pre-transcoded clip, or a raw source clip if the library was never built"""
+        clip = self.choose()
+        if clip is not None:
+            return clip.path
+        if not os.path.isdir(self.source_dir):
+            return None
+        sources = [filename for filename in os.listdir(self.source_dir) if filename.lower().endswith(VIDEO_EXTENSIONS)]
+        if not sources:
+            return None
+        # Raw clips are rescaled by the render itself
+        return os.path.join(self.source_dir, random.choice(sources))
+
+    def lookup(self, path:str) -> OverlayClip | None:
+        return self.clips.get(path)
+
+    def _transcode(self, source:str, stat:os.stat_result) -> OverlayClip:
+        output = os.path.join(self.library_dir, os.path.splitext(os.path.basename(source))[0] + f"_{self.width}w.mp4")
+        print(f"Normalising overlay {source} -> {output}")
+        subprocess.run([
+            'ffmpeg', '-y', '-loglevel', 'warning', '-i', source,
+            '-vf', f'scale={self.width}:-2,setsar=1,fps={self.fps}',
+            '-an', '-c:v', 'libx264', '-preset', 'slow', '-crf', '23', '-pix_fmt', 'yuv420p',
+            '-g', str(self.fps), '-movflags', '+faststart', output
+        ], check=True)
+        probed = probe(output)
+        return OverlayClip(
+            path=output,
+            source=source,
+            source_mtime=stat.st_mtime,
+            source_size=stat.st_size,
+            duration=probed.duration,
+            width=probed.width,
+            height=probed.height,
+            fps=self.fps,
+        )
+
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_overlay_library() -> OverlayLibrary:
+    """Process-wide library, loaded from the manifest written at deploy time"""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = OverlayLibrary()
+            if not _library.clips:
+                print(f"No overlay manifest in {_library.library_dir}, using raw clips from {_library.source_dir}")
+        return _library
+
+
+if __name__ == "__main__":
+    library = OverlayLibrary()
+    if not os.path.isdir(library.source_dir):
+        raise SystemExit(f"No overlay clips to transcode in {library.source_dir}")
+    for clip in library.build():
+        print(f"{clip.path}: {clip.width}x{clip.height} @ {clip.fps}fps, {clip.duration:.1f}s")
@@ -0,0 +1,58 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import select, tuple_, or_, and_
+from sqlalchemy.orm import Session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+def encode_cursor(created_at:datetime | None, id) -> str:
+    payload = json.dumps([created_at.isoformat() if created_at is not None else None, id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor:str) -> tuple[datetime | None, object]:
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (datetime.fromisoformat(created_at) if created_at is not None else None), id
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(db:Session, model, columns:list, filters:list, cursor:str=None, limit:int=DEFAULT_PAGE_SIZE) -> tuple[list[dict], str | None]:
+    """
+    One page of rows, newest first, continuing after cursor.
+
+    Rows are ordered by (created_at, id) descending and the cursor is the last
+    row's pair, so each page is an index range scan on (..., created_at, id)
+    no matter how deep into the listing it is. Only the given columns are read.
+    Rows without a created_at (inserted before it had a default) come first,
+    as a descending scan of the index returns them, ordered by id alone.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key = (model.created_at, model.id)
+    # Column objects overload ==, so membership is checked by identity
+    extra = [column for column in key if not any(column is selected for selected in columns)]
+    query = select(*columns, *extra).where(*filters)
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.where(or_(and_(model.created_at.is_(None), model.id < id), model.created_at.is_not(None)))
+        else:
+            query = query.where(tuple_(*key) < tuple_(created_at, id))
+    # One extra row tells us whether there is a next page
+    query = query.order_by(model.created_at.desc().nulls_first(), model.id.desc()).limit(limit + 1)
+    rows = db.execute(query).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return [dict(row) for row in rows], next_cursor
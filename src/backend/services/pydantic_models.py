@@ -5,6 +5,10 @@ class Quiz(BaseModel):
     answer: str
     choices: list[str]
 
+class LLMResponse(BaseModel):
+    text: str | None
+    parsed: list[Quiz] | None = None
+
 class VideoSegment(BaseModel):
     start_time: float
     end_time: float
@@ -14,3 +18,26 @@ class VideoSegment(BaseModel):
     chunk_id: int
 
 
+
+class OCRPage(BaseModel):
+    index: int
+    markdown: str
+
+class OCRResult(BaseModel):
+    pages: list[OCRPage]
+
+class MaterialChunk(BaseModel):
+    text: str
+    # Where the chunk starts and ends: page index and character offset into that page's markdown
+    page_start: int
+    char_start: int
+    page_end: int
+    char_end: int
+    token_count: int
+    # Leading characters of text repeated from the previous chunk
+    overlap_chars: int = 0
+
+class TranscriptSnippet(BaseModel):
+    text: str
+    start: float
+    duration: float
@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import subprocess
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import yt_dlp
+from pydantic import BaseModel
+
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", 2))
+# 0 lets ffmpeg pick; set this so concurrent renders do not oversubscribe the CPU
+RENDER_THREADS = int(os.getenv("RENDER_THREADS", 0))
+RENDER_PRESET = os.getenv("RENDER_PRESET", "balanced")
+RENDER_WIDTH = int(os.getenv("RENDER_WIDTH", 720))
+MAX_CHUNK_SECONDS = 60
+
+# libx264 speed/quality trade-offs
+PRESETS = {
+    "fast": {"preset": "veryfast", "crf": 28},
+    "balanced": {"preset": "medium", "crf": 23},
+    "quality": {"preset": "slow", "crf": 20},
+}
+
+
+class RenderJob(BaseModel):
+    video_id: str
+    start_time: float
+    end_time: float
+    output_path: str
+    subtitles_file: str | None = None
+    overlay_video_path: str | None = None
+    # Known for overlay-library clips, which then skip the probe entirely
+    overlay_width: int | None = None
+    preset: str = RENDER_PRESET
+    threads: int = RENDER_THREADS
+    width: int = RENDER_WIDTH
+
+class RenderResult(BaseModel):
+    output_path: str | None
+    duration: float
+    timings: dict[str, float]
+    error: str | None = None
+
+
+class Probe(BaseModel):
+    duration: float
+    width: int | None = None
+    height: int | None = None
+
+
+@lru_cache(maxsize=1024)
+def _probe(path:str, mtime:float, size:int) -> Probe:
+    output = subprocess.check_output([
+        'ffprobe', '-v', 'error', '-print_format', 'json',
+        '-show_entries', 'format=duration:stream=codec_type,width,height', path
+    ])
+    info = json.loads(output)
+    video_stream = next((stream for stream in info.get("streams", []) if stream.get("codec_type") == "video"), {})
+    return Probe(duration=float(info["format"]["duration"]), width=video_stream.get("width"), height=video_stream.get("height"))
+
+def probe(path:str) -> Probe:
+    """One ffprobe call per file version; results are cached on (path, mtime, size)"""
+    stat = os.stat(path)
+    return _probe(path, stat.st_mtime, stat.st_size)
+
+
+def resolve_stream_url(video_id:str) -> str:
+    """Direct media URL for a progressive MP4, so ffmpeg can seek into it without a separate download"""
+    ydl_opts = {
+        'format': 'best[ext=mp4]/best',
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+    return info["url"]
+
+
+def build_command(job:RenderJob, source_url:str, duration:float, overlay_width:int=None) -> list[str]:
+    """A single ffmpeg graph: seek and trim the source, stack the looped overlay, burn subtitles, encode"""
+    preset = PRESETS.get(job.preset, PRESETS["balanced"])
+    cmd = ['ffmpeg', '-y', '-loglevel', 'warning',
+           '-ss', f'{job.start_time}', '-t', f'{duration}', '-i', source_url]
+    filters = [f'[0:v]scale={job.width}:-2,setsar=1,setpts=PTS-STARTPTS[top]']
+    last = 'top'
+    if job.overlay_video_path:
+        # -stream_loop repeats the overlay at the demuxer, so nothing is buffered in a loop filter
+        cmd += ['-stream_loop', '-1', '-i', job.overlay_video_path]
+        # Overlays already at the target width skip the per-frame rescale
+        scale = '' if overlay_width == job.width else f'scale={job.width}:-2,setsar=1,'
+        filters.append(f'[1:v]{scale}setpts=PTS-STARTPTS[bottom]')
+        filters.append('[top][bottom]vstack=inputs=2:shortest=1[stacked]')
+        last = 'stacked'
+    if job.subtitles_file:
+        escaped_subtitles_path = job.subtitles_file.replace("'", "'\\''")
+        filters.append(f"[{last}]subtitles='{escaped_subtitles_path}':force_style='FontSize=24,Alignment=2'[outv]")
+        last = 'outv'
+    cmd += ['-filter_complex', ';'.join(filters), '-map', f'[{last}]', '-map', '0:a?',
+            '-c:v', 'libx264', '-preset', preset["preset"], '-crf', str(preset["crf"]),
+            '-c:a', 'aac', '-movflags', '+faststart', '-t', f'{duration}']
+    if job.threads:
+        cmd += ['-threads', str(job.threads), '-filter_complex_threads', str(job.threads)]
+    cmd.append(job.output_path)
+    return cmd
+
+
+def render(job:RenderJob) -> RenderResult:
+    """Render one job, recording how long each stage took"""
+    timings = {}
+    duration = min(job.end_time - job.start_time, MAX_CHUNK_SECONDS)
+    try:
+        started = time.perf_counter()
+        source_url = resolve_stream_url(job.video_id)
+        timings["resolve"] = time.perf_counter() - started
+
+        overlay_width = job.overlay_width
+        if job.overlay_video_path and overlay_width is None:
+            started = time.perf_counter()
+            overlay_width = probe(job.overlay_video_path).width
+            timings["probe"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        subprocess.run(build_command(job, source_url, duration, overlay_width), check=True)
+        timings["render"] = time.perf_counter() - started
+        timings["total"] = sum(timings.values())
+        print(f"Rendered {job.output_path} in {timings['total']:.1f}s: " + ", ".join(f"{stage}={seconds:.1f}s" for stage, seconds in timings.items() if stage != "total"))
+        return RenderResult(output_path=job.output_path, duration=duration, timings=timings)
+    except Exception as e:
+        print(f"Error rendering {job.video_id} {job.start_time}-{job.end_time}: {e}")
+        return RenderResult(output_path=None, duration=duration, timings=timings, error=str(e))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    Process-wide pool that caps how many renders run at once.
+
+    Workers are spawned rather than forked: the API is multithreaded, and a
+    forked child inherits any lock another thread held at fork time. The API
+    creates the pool from its lifespan rather than from a video_executor thread.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RENDER_CONCURRENCY, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def submit_render(job:RenderJob):
+    return get_render_pool().submit(render, job)
@@ -0,0 +1,85 @@
+import re
+from typing import Callable
+
+# Gaps between snippets, in seconds. Speakers almost always pause between
+# sentences; a near-zero gap means the caption was split mid-sentence.
+LONG_PAUSE = 1.0
+SHORT_PAUSE = 0.15
+
+TERMINAL_PUNCTUATION = re.compile(r"[.!?…]['\")\]]*$")
+CONTINUATION_PUNCTUATION = re.compile(r"[,;:\-–—]$")
+# Words that cannot end an English sentence
+CONTINUATION_WORDS = {
+    "a", "an", "the", "and", "or", "but", "so", "of", "to", "in", "on", "at", "for",
+    "with", "from", "by", "as", "that", "which", "who", "is", "are", "was", "were",
+    "be", "if", "because", "than", "then", "my", "your", "our", "their", "its", "this",
+}
+
+
+def _gap(current, following) -> float:
+    return following.start - (current.start + current.duration)
+
+
+def is_punctuated(snippets:list) -> bool:
+    """Auto-generated captions have no sentence punctuation, and their casing carries no signal either"""
+    return any(TERMINAL_PUNCTUATION.search(snippet.text.strip()) for snippet in snippets)
+
+
+def local_sentence_boundary(current, following, punctuated:bool=True) -> bool | None:
+    """
+    Decide from the snippet text and timings alone whether a sentence ends at
+    `current`. Returns None when the heuristics disagree or are inconclusive.
+    Casing is only read when the transcript is punctuated; otherwise only
+    pauses decide, and segment length caps whatever they leave joined.
+    """
+    text = current.text.strip()
+    next_text = following.text.strip()
+    if not text:
+        return False
+    if TERMINAL_PUNCTUATION.search(text):
+        return True
+    words = text.lower().split()
+    if CONTINUATION_PUNCTUATION.search(text) or (words and words[-1] in CONTINUATION_WORDS):
+        return False
+    gap = _gap(current, following)
+    if gap >= LONG_PAUSE:
+        return True
+    if punctuated and next_text[:1].islower():
+        return False
+    if gap <= SHORT_PAUSE and not (punctuated and next_text[:1].isupper()):
+        return False
+    # Capitalised continuation or a medium pause: genuinely ambiguous
+    return None
+
+
+def detect_sentence_boundaries(snippets:list, llm_fallback:Callable[[list[tuple[str, str, str]]], list[bool]] | None=None) -> list[bool]:
+    """
+    Return, for every snippet, whether a sentence ends at it.
+
+    Most boundaries are settled locally; the uncertain ones are sent to
+    llm_fallback in a single batch of (past, current, next) windows. Without a
+    fallback, uncertain boundaries are treated as sentence ends only when
+    preceded by a pause.
+    """
+    boundaries = [None] * len(snippets)
+    if snippets:
+        boundaries[-1] = True
+    punctuated = is_punctuated(snippets)
+    for i in range(len(snippets) - 1):
+        boundaries[i] = local_sentence_boundary(snippets[i], snippets[i + 1], punctuated)
+
+    uncertain = [i for i, boundary in enumerate(boundaries) if boundary is None]
+    if uncertain and llm_fallback is not None:
+        windows = [
+            (snippets[i - 1].text if i > 0 else "", snippets[i].text, snippets[i + 1].text)
+            for i in uncertain
+        ]
+        try:
+            for i, decision in zip(uncertain, llm_fallback(windows)):
+                boundaries[i] = decision
+        except Exception as e:
+            print(f"Sentence slicer fallback failed, using pause heuristic: {e}")
+    for i in uncertain:
+        if boundaries[i] is None:
+            boundaries[i] = _gap(snippets[i], snippets[i + 1]) > SHORT_PAUSE
+    return boundaries
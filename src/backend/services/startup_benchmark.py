@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import socket
+import statistics
+import subprocess
+import httpx
+
+STARTUP_BENCHMARK_RUNS = int(os.getenv("STARTUP_BENCHMARK_RUNS", 5))
+STARTUP_TIMEOUT = float(os.getenv("STARTUP_TIMEOUT_SECONDS", 120))
+APP = "src.backend.main:app"
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); "
+    "import src.backend.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def import_time() -> float:
+    """Seconds to import the app in a fresh interpreter, as a cold container would"""
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], text=True)
+    return float(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(path:str="/") -> float:
+    """Seconds from launching uvicorn until the first successful response to path"""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", APP, "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < STARTUP_TIMEOUT:
+                if server.poll() is not None:
+                    raise Exception(f"Server exited with code {server.returncode} before responding")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}{path}").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.02)
+        raise Exception(f"No response from {path} within {STARTUP_TIMEOUT}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(label:str, samples:list[float]):
+    print(f"{label}: median {statistics.median(samples):.2f}s, min {min(samples):.2f}s, max {max(samples):.2f}s over {len(samples)} runs")
+
+
+if __name__ == "__main__":
+    summarize("Import time", [import_time() for _ in range(STARTUP_BENCHMARK_RUNS)])
+    summarize("Time to first response", [time_to_first_response() for _ in range(STARTUP_BENCHMARK_RUNS)])
@@ -0,0 +1,97 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy.orm import sessionmaker
+from youtube_transcript_api import YouTubeTranscriptApi
+from src.backend.services.models import Transcript_Cache
+from src.backend.services.database import SessionLocal
+from src.backend.services.pydantic_models import TranscriptSnippet
+from src.backend.services.embedding_cache import LRUCache
+
+TRANSCRIPT_TTL = timedelta(seconds=int(os.getenv("TRANSCRIPT_TTL_SECONDS", 7 * 24 * 3600)))
+TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", 512))
+
+
+class TranscriptStore:
+    """
+    Read-through transcript cache keyed by (YouTube video id, language).
+
+    An in-memory LRU sits in front of the transcript_cache table, so each
+    video's transcript is fetched from YouTube at most once per TTL.
+    """
+    def __init__(self, session_factory:sessionmaker=None, ttl:timedelta=TRANSCRIPT_TTL, max_size:int=TRANSCRIPT_CACHE_SIZE):
+        self.session_factory = session_factory or SessionLocal
+        self.ttl = ttl
+        self.memory = LRUCache(max_size)
+        self.hits = {"memory": 0, "database": 0}
+        self.misses = 0
+        self._ytt_api = YouTubeTranscriptApi()
+        self._lock = threading.Lock()
+
+    def get(self, video_id:str, language:str="en") -> list[TranscriptSnippet]:
+        key = (video_id, language)
+        entry = self.memory.get(key)
+        if entry is not None and not self._expired(entry[0]):
+            self._count("memory")
+            return entry[1]
+
+        # Each session is closed before the next step, so no pooled connection
+        # sits idle in a transaction while YouTube responds
+        db = self.session_factory()
+        try:
+            row = db.get(Transcript_Cache, key)
+            if row is not None and not self._expired(row.fetched_at):
+                snippets = [TranscriptSnippet(**snippet) for snippet in row.snippets]
+                self.memory.put(key, (row.fetched_at, snippets))
+                self._count("database")
+                return snippets
+        finally:
+            db.close()
+
+        self._count(None)
+        fetched = self._ytt_api.fetch(video_id, languages=[language])
+        snippets = [TranscriptSnippet(text=snippet.text, start=snippet.start, duration=snippet.duration) for snippet in fetched]
+        fetched_at = datetime.now()
+        db = self.session_factory()
+        try:
+            db.merge(Transcript_Cache(
+                video_id=video_id,
+                language=language,
+                snippets=[snippet.model_dump() for snippet in snippets],
+                fetched_at=fetched_at,
+            ))
+            db.commit()
+        finally:
+            db.close()
+        self.memory.put(key, (fetched_at, snippets))
+        return snippets
+
+    def stats(self) -> dict:
+        lookups = self.hits["memory"] + self.hits["database"] + self.misses
+        return {
+            "memory_hits": self.hits["memory"],
+            "database_hits": self.hits["database"],
+            "misses": self.misses,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
+
+    def _expired(self, fetched_at:datetime) -> bool:
+        return datetime.now() - fetched_at > self.ttl
+
+    def _count(self, tier:str | None):
+        with self._lock:
+            if tier is None:
+                self.misses += 1
+            else:
+                self.hits[tier] += 1
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_transcript_store() -> TranscriptStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TranscriptStore()
+        return _store
@@ -0,0 +1,287 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy.orm import Session
+from src.backend.services.models import Material, Material_Metadata, Video_Transcript, Video_Metadata
+
+# Below this many vectors a flat scan is already sub-millisecond, so the
+# coarse quantizer is only trained once an index grows past it. The lists are
+# re-partitioned whenever the index has grown RETRAIN_GROWTH times since then.
+TRAIN_THRESHOLD = 4096
+RETRAIN_GROWTH = 4
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_SIZE = 65536
+DEFAULT_NPROBE = 8
+# Loaded indexes are evicted least recently used first once they hold more than
+# this many bytes of vectors. The API runs in a 512Mi Cloud Run container that
+# also holds the embedding and OCR caches, and retraining an index briefly
+# holds a second copy of it, so the bound is a quarter of the container
+VECTOR_INDEX_MAX_BYTES = int(os.getenv("VECTOR_INDEX_MAX_BYTES", 128 * 1024 * 1024))
+
+
+def normalize(vectors) -> np.ndarray:
+    """Return float32 row-normalised copies so cosine similarity is a dot product"""
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _InvertedList:
+    """Append-only (ids, vectors) buffer with amortised doubling growth"""
+    def __init__(self, dim:int):
+        self.size = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+
+    def append(self, ids:np.ndarray, vectors:np.ndarray):
+        needed = self.size + len(ids)
+        if needed > len(self.ids):
+            capacity = max(needed, 2 * len(self.ids), 64)
+            grown_ids = np.empty(capacity, dtype=np.int64)
+            grown_vectors = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown_ids[:self.size] = self.ids[:self.size]
+            grown_vectors[:self.size] = self.vectors[:self.size]
+            self.ids, self.vectors = grown_ids, grown_vectors
+        self.ids[self.size:needed] = ids
+        self.vectors[self.size:needed] = vectors
+        self.size = needed
+
+    def view(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.ids[:self.size], self.vectors[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.vectors.nbytes
+
+
+class VectorIndex:
+    """
+    Inverted-file (IVF) cosine index over a single user's embeddings.
+
+    Vectors are kept in one flat list until the index holds TRAIN_THRESHOLD
+    of them, then spherical k-means partitions them into ~sqrt(n) lists and
+    queries only scan the nprobe lists closest to the query. k-means runs on
+    a snapshot outside the lock, so searches keep using the current lists
+    until the new ones are swapped in.
+    """
+    def __init__(self, dim:int, nprobe:int=DEFAULT_NPROBE, train_threshold:int=TRAIN_THRESHOLD):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.centroids = None
+        self.trained_size = 0
+        self.max_id = -1
+        self.lists = [_InvertedList(dim)]
+        self._training = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return sum(inverted_list.size for inverted_list in self.lists)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            centroid_bytes = self.centroids.nbytes if self.is_trained else 0
+            return centroid_bytes + sum(inverted_list.nbytes for inverted_list in self.lists)
+
+    def add(self, ids:list[int], vectors, only_new:bool=False):
+        """Add vectors; with only_new, ids at or below max_id are skipped as already loaded"""
+        if len(ids) == 0:
+            return
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = normalize(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of dimension {self.dim}, got {vectors.shape[1]}")
+        with self._lock:
+            if only_new:
+                fresh = ids > self.max_id
+                ids, vectors = ids[fresh], vectors[fresh]
+                if len(ids) == 0:
+                    return
+            self.max_id = max(self.max_id, int(ids.max()))
+            if self.is_trained:
+                _assign(self.lists, self.centroids, ids, vectors)
+                train_at = RETRAIN_GROWTH * self.trained_size
+            else:
+                self.lists[0].append(ids, vectors)
+                train_at = self.train_threshold
+            snapshot = None
+            if not self._training and len(self) >= train_at:
+                self._training = True
+                snapshot = [inverted_list.view() for inverted_list in self.lists]
+        if snapshot is not None:
+            self._train(snapshot)
+
+    def search(self, query, k:int=10) -> list[tuple[int, float]]:
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        query = normalize(query)[0]
+        with self._lock:
+            if self.is_trained:
+                nprobe = min(self.nprobe, len(self.lists))
+                closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                candidates = [self.lists[list_id].view() for list_id in closest]
+            else:
+                candidates = [self.lists[0].view()]
+            ids = np.concatenate([candidate_ids for candidate_ids, _ in candidates])
+            vectors = np.concatenate([candidate_vectors for _, candidate_vectors in candidates])
+        if len(ids) == 0:
+            return []
+        scores = vectors @ query
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def _train(self, snapshot:list[tuple[np.ndarray, np.ndarray]]):
+        """
+        Partition a snapshot of the lists with k-means, then swap the new lists in.
+
+        Appends never touch the rows a snapshot covers, so it is read without
+        the lock; rows added meanwhile are moved across during the swap.
+        """
+        try:
+            ids = np.concatenate([list_ids for list_ids, _ in snapshot])
+            vectors = np.concatenate([list_vectors for _, list_vectors in snapshot])
+            nlist = max(1, int(np.sqrt(len(ids))))
+            rng = np.random.default_rng(0)
+            sample = vectors
+            if len(vectors) > KMEANS_SAMPLE_SIZE:
+                sample = vectors[rng.choice(len(vectors), KMEANS_SAMPLE_SIZE, replace=False)]
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                assignments = np.argmax(sample @ centroids.T, axis=1)
+                for list_id in range(nlist):
+                    members = sample[assignments == list_id]
+                    if len(members):
+                        centroids[list_id] = members.sum(axis=0)
+                centroids = normalize(centroids)
+            lists = [_InvertedList(self.dim) for _ in range(nlist)]
+            _assign(lists, centroids, ids, vectors)
+            with self._lock:
+                for (snapshot_ids, _), inverted_list in zip(snapshot, self.lists):
+                    list_ids, list_vectors = inverted_list.view()
+                    if len(list_ids) > len(snapshot_ids):
+                        _assign(lists, centroids, list_ids[len(snapshot_ids):], list_vectors[len(snapshot_ids):])
+                self.centroids = centroids
+                self.trained_size = len(ids)
+                self.lists = lists
+        finally:
+            with self._lock:
+                self._training = False
+
+
+def _assign(lists:list[_InvertedList], centroids:np.ndarray, ids:np.ndarray, vectors:np.ndarray):
+    """Append each vector to the list of its nearest centroid"""
+    assignments = np.argmax(vectors @ centroids.T, axis=1)
+    for list_id in np.unique(assignments):
+        mask = assignments == list_id
+        lists[list_id].append(ids[mask], vectors[mask])
+
+
+class VectorIndexRegistry:
+    """
+    Lazily loaded per-user indexes over Material and Video_Transcript embeddings.
+
+    Indexes are kept in LRU order and evicted once together they exceed
+    max_bytes. Every get() first pulls rows above the index's highest loaded
+    id, so rows inserted by other processes (the batch ingestion job, the
+    embedding backfill, other instances) are searchable without a restart.
+    """
+    SOURCES = ("materials", "video_transcript")
+
+    def __init__(self, nprobe:int=DEFAULT_NPROBE, max_bytes:int=VECTOR_INDEX_MAX_BYTES):
+        self.nprobe = nprobe
+        self.max_bytes = max_bytes
+        self._indexes: OrderedDict[tuple[str, str], VectorIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db:Session, user_id:str, source:str="materials") -> VectorIndex | None:
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown index source: {source}")
+        key = (user_id, source)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+        if index is not None:
+            ids, vectors = self._load(db, user_id, source, after_id=index.max_id)
+            self._append(index, ids, vectors)
+        else:
+            ids, vectors = self._load(db, user_id, source)
+            if not ids:
+                return None
+            index = VectorIndex(len(vectors[0]), nprobe=self.nprobe)
+            index.add(ids, vectors)
+            with self._lock:
+                index = self._indexes.setdefault(key, index)
+        self._evict_over_budget(keep=key)
+        return index
+
+    def add(self, user_id:str, source:str, ids:list[int], vectors):
+        """Append freshly inserted rows to an index that is already loaded"""
+        with self._lock:
+            index = self._indexes.get((user_id, source))
+        if index is not None:
+            self._append(index, ids, vectors)
+            self._evict_over_budget()
+
+    def evict(self, user_id:str):
+        with self._lock:
+            for source in self.SOURCES:
+                self._indexes.pop((user_id, source), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return {"indexes": len(indexes), "nbytes": sum(index.nbytes for index in indexes), "max_bytes": self.max_bytes}
+
+    def _append(self, index:VectorIndex, ids:list[int], vectors):
+        # Rows already pulled in by a refresh are skipped, so a concurrent add() and get() never duplicate them
+        index.add(ids, vectors, only_new=True)
+
+    def _evict_over_budget(self, keep:tuple[str, str]=None):
+        with self._lock:
+            total = sum(index.nbytes for index in self._indexes.values())
+            for key in list(self._indexes):
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                total -= self._indexes.pop(key).nbytes
+
+    def _load(self, db:Session, user_id:str, source:str, after_id:int=-1) -> tuple[list[int], list[list[float]]]:
+        if source == "materials":
+            rows = db.query(Material.id, Material.embedding).join(
+                Material_Metadata,
+                Material.doc_id == Material_Metadata.id
+            ).filter(Material_Metadata.user_id == user_id, Material.id > after_id).order_by(Material.id).all()
+        else:
+            rows = db.query(Video_Transcript.id, Video_Transcript.embedding).join(
+                Video_Metadata,
+                Video_Transcript.video_id == Video_Metadata.id
+            ).filter(Video_Metadata.user_id == user_id, Video_Transcript.id > after_id).order_by(Video_Transcript.id).all()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+
+if __name__ == "__main__":
+    import time
+    rng = np.random.default_rng(42)
+    n, dim = 200_000, 1024
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    index = VectorIndex(dim)
+    start = time.perf_counter()
+    for offset in range(0, n, 10_000):
+        index.add(list(range(offset, offset + 10_000)), vectors[offset:offset + 10_000])
+    print(f"Indexed {len(index)} vectors in {time.perf_counter() - start:.2f}s ({len(index.lists)} lists)")
+    queries = vectors[rng.choice(n, 100, replace=False)]
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k=10)
+    print(f"Average query latency: {(time.perf_counter() - start) * 1000 / len(queries):.2f}ms")
@@ -1,16 +1,23 @@
 import json
 import random
+import asyncio
+from typing import AsyncIterator
 import yt_dlp
 import os
 from pytube import extract
 import requests
-import googleapiclient.discovery
-from youtube_transcript_api import YouTubeTranscriptApi
 from dotenv import load_dotenv
-from src.backend.services.pydantic_models import VideoSegment
+from src.backend.services.pydantic_models import VideoSegment, TranscriptSnippet
+from src.backend.services.transcript_store import get_transcript_store
 from src.backend.services.gemini_client import Gemini, GeminiModel, GeminiEmbeddingModel
 from src.backend.services.cohere_client import Cohere
-from src.backend.services.groq_client import sentence_slicer, SentenceSlicer
+from src.backend.services.groq_client import sentence_slicer_batch
+from src.backend.services.segmentation import detect_sentence_boundaries
+from src.backend.services.vector_index import normalize
+from src.backend.services.render_engine import RenderJob, RENDER_PRESET, submit_render
+from src.backend.services.overlay_library import get_overlay_library
+from src.backend.services.youtube_client import get_youtube_service, thread_http
+from src.backend.services.youtube_search import search_cache, quota_tracker, QuotaExceededError, SEARCH_LIST_COST
 import numpy as np
 load_dotenv()   
 
@@ -18,6 +25,7 @@ max_results = 10
 page_token = None
 query = "python"
 SIMLIARITY_THRESHOLD = 0.3
+MAX_SEARCH_PAGES = int(os.getenv("YOUTUBE_MAX_SEARCH_PAGES", 5))
 
 def cosine_similarity(a:list[float], b:list[float]) -> float:
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
@@ -43,10 +51,16 @@ class Search_Response:
 
 class Youtube:
     def __init__(self, api_key:str):
-        self.api_key = api_key
-        self.youtube = googleapiclient.discovery.build(serviceName='youtube', version='v3', developerKey=os.getenv('YOUTUBE_API_KEY'))
+        self.api_key = api_key or os.getenv('YOUTUBE_API_KEY')
+        # Built once per process from a local discovery document, so this is nearly free
+        self.youtube = get_youtube_service(self.api_key)
 
     def search_youtube(self, query:str, max_results:int=10, page_token:str=None):
+        cache_key = (query, max_results, page_token)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        quota_tracker.charge(SEARCH_LIST_COST)
         request = self.youtube.search().list(
             part="snippet", # search by keyword
             maxResults=max_results,
@@ -55,9 +69,42 @@ class Youtube:
             videoCaption='closedCaption', # only include videos with captions
             type='video',   # only include videos, not playlists/channels
         )
-        response = request.execute()
+        response = request.execute(http=thread_http())
         search_response = Search_Response(response)
+        search_cache.put(cache_key, search_response)
         return search_response
+
+    async def iter_search_results(self, query:str, max_results:int=10, max_pages:int=MAX_SEARCH_PAGES) -> AsyncIterator[Search_Result]:
+        """
+        Yield search results page after page, following nextPageToken.
+
+        The next page is fetched in the background while the caller works
+        through the current one. Iteration stops early, without raising, once
+        the daily quota is exhausted after the first page.
+        """
+        search_response = await asyncio.to_thread(self.search_youtube, query, max_results)
+        pages = 1
+        while True:
+            next_page = None
+            if search_response.next_page_token and pages < max_pages:
+                next_page = asyncio.create_task(asyncio.to_thread(self.search_youtube, query, max_results, search_response.next_page_token))
+            try:
+                for search_result in search_response.search_results:
+                    yield search_result
+            except BaseException:
+                # The caller stopped early. Cancelling only stops waiting: the call in its
+                # thread still runs, is charged to the quota and fills the search cache
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+            if next_page is None:
+                return
+            try:
+                search_response = await next_page
+            except QuotaExceededError as e:
+                print(f"Stopping search pagination: {e}")
+                return
+            pages += 1
     
     def display_yt_results(self, search_response:Search_Response):
         for search_result in search_response.search_results:
@@ -70,13 +117,12 @@ class Youtube:
         response = gemini.client.models.generate_content(model=gemini.model, contents=prompt)
         return response.text
 
-    def download_youtube_transcript(self, video_id:str):
-        ytt_api = YouTubeTranscriptApi()
-        response = ytt_api.fetch(video_id)
-        return response
+    def download_youtube_transcript(self, video_id:str, language:str="en") -> list[TranscriptSnippet]:
+        # Served from the shared transcript store; YouTube is only hit once per TTL
+        return get_transcript_store().get(video_id, language)
 
-    def process_transcript_alternative(self, video_id:str, gemini:Gemini):
-        fetched_transcript = self.download_youtube_transcript(video_id)
+    def process_transcript_alternative(self, video_id:str, gemini:Gemini, transcript:list[TranscriptSnippet]=None):
+        fetched_transcript = transcript if transcript is not None else self.download_youtube_transcript(video_id)
         cleaned_text = " ".join(" ".join(snippet.text for snippet in fetched_transcript).replace(",", "").split())
         response = self.get_most_important_section(cleaned_text, gemini).strip().lower()
         time_stamps = [0, 0]
@@ -100,7 +146,7 @@ class Youtube:
             print("No matching segments found in transcript")
             return None, None, None
 
-        brainrot_video_path = os.path.join("src/backend/services/downloads", os.listdir("src/backend/services/downloads")[random.randint(0, len(os.listdir("src/backend/services/downloads")) - 1)])
+        brainrot_video_path = get_overlay_library().choose_path()
         
         # Add debug logging
         print(f"Time stamps: {time_stamps}")
@@ -117,71 +163,62 @@ class Youtube:
         return chunk_path, final_path, subtitles_file, time_stamps[1] - time_stamps[0]
     
 
-    def process_transcript(self, video_id:str, target_str:str, transcript:list[dict], co_client:Cohere) -> list[VideoSegment]:
+    def process_transcript(self, video_id:str, target_str:str, transcript:list[dict], co_client:Cohere, top_k:int=None) -> list[VideoSegment]:
         # The transcript is a list of dictionaries, not an object with snippets attribute
         snippets = transcript
-        target_embedding = co_client.embed([target_str]).embeddings.float[0]
         if not snippets:
             return []
-        video_segment = {
-            "text": "",
-            "start_time": snippets[0].start,
-            "end_time": snippets[0].start + snippets[0].duration,
-            "video_id": video_id,
-            "download": False,
-            "embedding": [],
-            "subtitles": []  # Add a field to store segment subtitles
-        }
+        segments = self.build_segments(video_id, snippets)
+
+        # Embed every segment in one batched call and score them with a single matrix-vector product
+        embeddings = co_client.embed_batch([target_str] + [segment["text"] for segment in segments])
+        normalized = normalize(embeddings)
+        similarities = normalized[1:] @ normalized[0]
+        ranked = [i for i in np.argsort(-similarities) if similarities[i] > SIMLIARITY_THRESHOLD]
+        if top_k is not None:
+            ranked = ranked[:top_k]
+
         video_segments = []
-        chunk_id = 0
-        for i, snippet in enumerate(snippets):
-            current_chunk = snippet.text
-            if i == 0:
-                video_segment["text"] += current_chunk
-                continue
-            else:
-                video_segment["text"] += " " + current_chunk
-                
+        for i in sorted(ranked):
+            video_segment = segments[i]
+            print(f"Found a segment with similarity {similarities[i]:.3f}: {video_segment['text']}")
+            video_segment["embedding"] = embeddings[i + 1]
+            video_segment["download"] = True
+            video_segment["subtitles"] = self.extract_segment_subtitles(snippets, video_segment["start_time"], video_segment["end_time"])
+            brainrot_video_path = get_overlay_library().choose_path()
+            self.download_youtube_chunk(video_id, video_segment["start_time"], video_segment["end_time"], "chunks", video_segment["subtitles"], overlay_video_path=brainrot_video_path)
+            video_segments.append(VideoSegment(**video_segment))
+        return video_segments
+
+    def build_segments(self, video_id:str, snippets:list) -> list[dict]:
+        """Group snippets into sentence-aligned segments of roughly 20-60 seconds"""
+        # Settle every sentence boundary up front; only ambiguous ones reach the LLM, in one batch
+        sentence_boundaries = detect_sentence_boundaries(snippets, llm_fallback=sentence_slicer_batch)
+
+        def new_segment(snippet) -> dict:
+            return {
+                "text": snippet.text,
+                "start_time": snippet.start,
+                "end_time": snippet.start + snippet.duration,
+                "video_id": video_id,
+                "download": False,
+                "embedding": [],
+                "subtitles": []  # Filled in only for segments that get rendered
+            }
+
+        segments = []
+        video_segment = new_segment(snippets[0])
+        for i, snippet in enumerate(snippets[1:], start=1):
+            video_segment["text"] += " " + snippet.text
             video_segment["end_time"] = snippet.start + snippet.duration
             current_duration = video_segment["end_time"] - video_segment["start_time"]
-            if i > 0 and i < len(snippets) - 1:
-                past_chunk = snippets[i-1].text
-                next_chunk = snippets[i+1].text
-                is_sentence_end = sentence_slicer(past_chunk, current_chunk, next_chunk).is_sentence_end
-                if (is_sentence_end and current_duration > 20) or current_duration >= 60:
-                    chunk_id += 1
-                    embedding = co_client.embed([video_segment["text"]]).embeddings.float[0]
-                    video_segment["embedding"] = embedding
-                    similarity = cosine_similarity(embedding, target_embedding)
-                    print(f"Similarity: {similarity}")
-                    if similarity > SIMLIARITY_THRESHOLD:
-                        video_segment["download"] = True
-                        video_segment["subtitles"] = self.extract_segment_subtitles(snippets, video_segment["start_time"], video_segment["end_time"])
-                        random_int = random.randint(0, len(os.listdir("src/backend/services/downloads")) - 1)
-                        brainrot_video_path = os.path.join("src/backend/services/downloads", os.listdir("src/backend/services/downloads")[random_int])
-                        self.download_youtube_chunk(video_id, video_segment["start_time"], video_segment["end_time"], "chunks", video_segment["subtitles"], overlay_video_path=brainrot_video_path)
-                        video_segment["chunk_id"] = chunk_id
-                        video_segments.append(VideoSegment(**video_segment))
-                    video_segment = {
-                        "text": snippet.text,
-                        "start_time": snippet.start,
-                        "end_time": snippet.start + snippet.duration,
-                        "video_id": video_id,
-                        "download": False,
-                        "embedding": [],
-                        "subtitles": []  # Initialize as empty, will be calculated when needed
-                    }
-
-        if video_segment["text"] and (not video_segments or video_segments[-1].text != video_segment["text"]):
-            embedding = co_client.embed([video_segment["text"]]).embeddings.float[0]
-            video_segment["embedding"] = embedding
-            if cosine_similarity(embedding, target_embedding) > SIMLIARITY_THRESHOLD:
-                print(f"Found a segment: {video_segment['text']}")
-                video_segment["download"] = True
-                video_segment["subtitles"] = self.extract_segment_subtitles(snippets, video_segment["start_time"], video_segment["end_time"])
-                self.download_youtube_chunk(video_id, video_segment["start_time"], video_segment["end_time"], "chunks", video_segment["subtitles"])
-                video_segments.append(VideoSegment(**video_segment))
-        return video_segments
+            if i < len(snippets) - 1 and ((sentence_boundaries[i] and current_duration > 20) or current_duration >= 60):
+                segments.append(video_segment)
+                video_segment = new_segment(snippet)
+        segments.append(video_segment)
+        for chunk_id, segment in enumerate(segments, start=1):
+            segment["chunk_id"] = chunk_id
+        return segments
 
     def extract_segment_subtitles(self, transcript:list[dict], start_time:float, end_time:float) -> list[dict]:
         """Extract subtitles for a specific segment of the video"""
@@ -200,10 +237,13 @@ class Youtube:
         
         return segment_subtitles
 
-    def download_youtube_chunk(self, video_id:str, start_time:float, end_time:float, output_path:str, subtitles=None, overlay_video_path=None):
+    def download_youtube_chunk(self, video_id:str, start_time:float, end_time:float, output_path:str, subtitles=None, overlay_video_path=None, preset:str=RENDER_PRESET):
         """
-        Download a specific chunk of a YouTube video as MP4 and optionally overlay another video with subtitles
-        
+        Render a specific chunk of a YouTube video as MP4, optionally stacked over another video with subtitles
+
+        The source is streamed straight into a single ffmpeg graph on the shared
+        render pool, so there is no intermediate chunk file.
+
         Args:
             url: YouTube video ID
             start_time: Start time in seconds
@@ -211,54 +251,23 @@ class Youtube:
             output_path: Directory to save the output
             subtitles: List of subtitle dictionaries with text, start, and duration
             overlay_video_path: Path to the video to overlay (if None, no overlay is added)
+            preset: Render speed/quality preset, one of render_engine.PRESETS
         """
         os.makedirs(output_path, exist_ok=True)
         
-        original_end_time = end_time
         duration = end_time - start_time
         if duration > 60:
             end_time = start_time + 60
             print(f"Limiting chunk duration to 60 seconds (1 minute), new end time: {end_time}")
-        chunk_filename = f"{output_path}/chunk_{start_time}_{end_time}.mp4"
         final_output = f"{output_path}/{video_id}_{start_time}_{end_time}.mp4"
+        subtitles_file = None
         
         # Skip if the final file already exists
         if os.path.exists(final_output):
             print(f"File {final_output} already exists, skipping processing")
-            return final_output
-            
-        # Download the original chunk if it doesn't exist
-        if not os.path.exists(chunk_filename):
-            def download_range_func(info_dict, ydl):
-                return [{
-                    'start_time': start_time,
-                    'end_time': end_time  # Using the potentially adjusted end_time
-                }]
-            
-            ydl_opts = {
-                'format': 'best[ext=mp4]/best',  # Get the best MP4 format
-                'outtmpl': chunk_filename,
-                'download_ranges': download_range_func,
-                'force_keyframes_at_cuts': True,
-                'quiet': True,  # Reduce output verbosity
-                'no_warnings': True,
-                'nooverwrites': True,  # Don't overwrite existing files
-                'external_downloader_args': ['-loglevel', 'warning'],  # Reduce ffmpeg verbosity
-            }
-            
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([f"https://www.youtube.com/watch?v={video_id}"])
-            except Exception as e:
-                print(f"Error downloading chunk {start_time}-{end_time}: {e}")
-                return None
-        
-        # If no overlay video is specified, return the original chunk
-        if not overlay_video_path:
-            return chunk_filename
+            return None, final_output, subtitles_file
             
         # Create subtitles file if provided
-        subtitles_file = None
         if subtitles:
             # Filter subtitles to only include those within our adjusted time range
             adjusted_subtitles = []
@@ -272,79 +281,22 @@ class Youtube:
                 
             subtitles_file = f"{output_path}/subs_{video_id}_{start_time}_{end_time}.srt"
             self.create_srt_file(adjusted_subtitles, subtitles_file)
-        assert os.path.exists(subtitles_file), f"Subtitles file {subtitles_file} does not exist"
-        chunk_duration = end_time - start_time
-        
-        # Use ffmpeg to create the final video with overlay and subtitles
-        try:
-            import subprocess
-            
-            # Verify the chunk file exists and get its actual duration
-            if not os.path.exists(chunk_filename):
-                print(f"Error: Downloaded chunk file {chunk_filename} does not exist")
-                return None
-            
-            duration_cmd = [
-                'ffprobe', '-v', 'error', '-show_entries', 'format=duration', 
-                '-of', 'default=noprint_wrappers=1:nokey=1', chunk_filename
-            ]
-            actual_chunk_duration = float(subprocess.check_output(duration_cmd).decode('utf-8').strip())
-            print(f"Actual chunk duration: {actual_chunk_duration} seconds")
-            
-            # Get the duration of the overlay video to calculate loop
-            overlay_duration_cmd = [
-                'ffprobe', '-v', 'error', '-show_entries', 'format=duration', 
-                '-of', 'default=noprint_wrappers=1:nokey=1', overlay_video_path
-            ]
-            overlay_duration = float(subprocess.check_output(overlay_duration_cmd).decode('utf-8').strip())
-            
-            # Build the ffmpeg command
-            cmd = [
-                'ffmpeg', '-y',  # Overwrite output files
-                '-i', chunk_filename,  # Input 1: YouTube chunk
-                '-i', overlay_video_path,  # Input 2: Overlay video
-                '-filter_complex',
-                # Stack the videos vertically, loop the bottom video as needed
-                f'[0:v]setpts=PTS-STARTPTS,trim=0:{min(actual_chunk_duration, 60)}[top];' +
-                f'[1:v]loop={max(1, int(min(actual_chunk_duration, 60)/overlay_duration))}:size={int(min(actual_chunk_duration, 60)*25)}:' +
-                f'start=0,setpts=PTS-STARTPTS,trim=0:{min(actual_chunk_duration, 60)}[bottom];' +
-                f'[top][bottom]vstack=inputs=2[v]'
-            ]
-            
-            if subtitles_file:
-                # Escape the path for FFmpeg
-                escaped_subtitles_path = subtitles_file.replace("'", "'\\''")
-                cmd[-1] += f';[v]subtitles=\'{escaped_subtitles_path}\':force_style=\'FontSize=24,Alignment=2\'[outv]'
-                cmd.extend(['-map', '[outv]'])
-            else:
-                cmd.extend(['-map', '[v]'])
-            
-            cmd.extend([
-                '-map', '0:a', 
-                '-af', f'atrim=0:{min(actual_chunk_duration, 60)}', 
-                '-t', f'{min(actual_chunk_duration, 60)}',  # Explicitly limit output duration
-                final_output
-            ])
-            
-            subprocess.run(cmd, check=True)
-            
-            # Verify the final output duration
-            final_duration_cmd = [
-                'ffprobe', '-v', 'error', '-show_entries', 'format=duration', 
-                '-of', 'default=noprint_wrappers=1:nokey=1', final_output
-            ]
-            final_duration = float(subprocess.check_output(final_duration_cmd).decode('utf-8').strip())
-            print(f"Final output duration: {final_duration} seconds")
-            
-            # Remove the chunk file after successful creation of the final output
 
-            
-            return chunk_filename, final_output, subtitles_file
-            
-        except Exception as e:
-            print(f"Error creating overlay video: {e}")
-            # Return the original chunk if overlay fails
-            return chunk_filename, final_output, subtitles_file
+        overlay_clip = get_overlay_library().lookup(overlay_video_path) if overlay_video_path else None
+        job = RenderJob(
+            video_id=video_id,
+            start_time=start_time,
+            end_time=end_time,
+            output_path=final_output,
+            subtitles_file=subtitles_file,
+            overlay_video_path=overlay_video_path,
+            overlay_width=overlay_clip.width if overlay_clip else None,
+            preset=preset,
+        )
+        result = submit_render(job).result()
+        if result.error:
+            return None
+        return None, final_output, subtitles_file
             
     def download_youtube_video(self, video_id, output_path, cookies_file=None, browser_cookies=None):
         """
@@ -420,14 +372,14 @@ class Youtube:
         return f"{hours:02d}:{minutes:02d}:{int(seconds):02d},{int((seconds % 1) * 1000):03d}"
 
 if __name__ == "__main__": 
-    video_id_visited = []
     target_str = input("Enter the target string: ")
     youtube = Youtube(os.getenv('YOUTUBE_API_KEY'))
-    search_response = youtube.search_youtube(target_str)
     gemini    = Gemini(os.getenv('GEMINI_API_KEY'), GeminiModel.FLASH, GeminiEmbeddingModel.EMBEDDING)
     co_client = Cohere(os.getenv('COHERE_API_KEY'))
-    while search_response.next_page_token or search_response.prev_page_token:
-        for i,search_result in enumerate(search_response.search_results):
+
+    async def main():
+        video_id_visited = []
+        async for search_result in youtube.iter_search_results(target_str):
             if search_result.video_id not in video_id_visited:
                 print(f"\nProcessing video {search_result.video_id}...")
                 print(f"__________________________________________________________")
@@ -438,8 +390,10 @@ if __name__ == "__main__":
                 if random_int == 0:
                     video_segments = youtube.process_transcript(video_id, target_str, transcript, co_client)
                 else:
-                    video_segments = youtube.process_transcript_alternative(video_id, gemini)
-                if len(video_segments) > 0:
+                    video_segments = youtube.process_transcript_alternative(video_id, gemini, transcript)
+                if video_segments and len(video_segments) > 0:
                     print(f"Found {len(video_segments)} segments")
                     for segment in video_segments:
                         print(segment.text)
+
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+import os
+import json
+import threading
+import httplib2
+import googleapiclient.discovery
+from googleapiclient import discovery_cache
+
+YOUTUBE_DISCOVERY_PATH = os.getenv("YOUTUBE_DISCOVERY_PATH", "src/backend/services/cache/youtube_v3_discovery.json")
+YOUTUBE_HTTP_TIMEOUT = int(os.getenv("YOUTUBE_HTTP_TIMEOUT", 30))
+
+_services = {}
+_services_lock = threading.Lock()
+_thread_local = threading.local()
+
+
+def load_discovery_document(path:str=YOUTUBE_DISCOVERY_PATH) -> str:
+    """
+    Discovery document for youtube v3, without a network round trip when possible.
+
+    Prefers a copy cached on disk, then the one bundled with
+    google-api-python-client, and only downloads it as a last resort.
+    """
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    document = discovery_cache.get_static_doc("youtube", "v3")
+    if document is None:
+        response, content = thread_http().request(
+            googleapiclient.discovery.DISCOVERY_URI.format(api="youtube", apiVersion="v3")
+        )
+        if response.status != 200:
+            raise Exception(f"Failed to fetch YouTube discovery document: {response.status}")
+        document = content.decode("utf-8")
+    json.loads(document)  # never cache a truncated or invalid document
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(document)
+    return document
+
+
+def thread_http() -> httplib2.Http:
+    """
+    One keep-alive httplib2 transport per thread.
+
+    httplib2.Http is not thread-safe, so the shared service object is paired
+    with a per-thread transport passed to request.execute(http=...).
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        http = httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT)
+        _thread_local.http = http
+    return http
+
+
+def get_youtube_service(api_key:str):
+    """Process-wide YouTube Data API service, built once per API key"""
+    with _services_lock:
+        service = _services.get(api_key)
+        if service is None:
+            service = googleapiclient.discovery.build_from_document(
+                load_discovery_document(),
+                developerKey=api_key,
+                http=thread_http(),
+            )
+            _services[api_key] = service
+        return service
@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from src.backend.services.embedding_cache import LRUCache
+
+SEARCH_CACHE_TTL = int(os.getenv("YOUTUBE_SEARCH_CACHE_TTL_SECONDS", 6 * 3600))
+SEARCH_CACHE_SIZE = int(os.getenv("YOUTUBE_SEARCH_CACHE_SIZE", 1024))
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", 10_000))
+# Each API instance counts only its own calls, so each gets an equal share of
+# the project's quota; keep this at the Cloud Run services' maxScale
+YOUTUBE_QUOTA_INSTANCES = int(os.getenv("YOUTUBE_QUOTA_INSTANCES", 10))
+# Units charged by the YouTube Data API v3 per call
+SEARCH_LIST_COST = 100
+# The daily quota resets at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+class QuotaTracker:
+    """
+    Estimates the YouTube Data API units this process spent today and refuses
+    calls that would exceed its share of the daily limit.
+
+    The count is an estimate, not Google's figure: it is per process, starts
+    at zero on every cold start and never sees calls made from elsewhere. A
+    prefetch the caller abandons is still counted, since cancelling it does
+    not stop the request already running in its thread.
+    """
+    def __init__(self, daily_limit:int=YOUTUBE_DAILY_QUOTA, instances:int=YOUTUBE_QUOTA_INSTANCES):
+        self.project_limit = daily_limit
+        self.instances = max(1, instances)
+        self.daily_limit = daily_limit // self.instances
+        self.day = None
+        self.used = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def charge(self, units:int):
+        with self._lock:
+            self._roll_over()
+            if self.used + units > self.daily_limit:
+                raise QuotaExceededError(f"YouTube quota exhausted: {self.used}/{self.daily_limit} units used today")
+            self.used += units
+            self.calls += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._roll_over()
+            return {
+                "day": str(self.day),
+                "estimated_used": self.used,
+                "limit": self.daily_limit,
+                "project_limit": self.project_limit,
+                "instances": self.instances,
+                "calls": self.calls,
+            }
+
+    def _roll_over(self):
+        today = datetime.now(QUOTA_TIMEZONE).date()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+            self.calls = 0
+
+
+class SearchCache:
+    """TTL cache of search responses keyed by (query, max_results, page_token)"""
+    def __init__(self, ttl:int=SEARCH_CACHE_TTL, max_size:int=SEARCH_CACHE_SIZE):
+        self.ttl = ttl
+        self.entries = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key:tuple):
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key:tuple, value):
+        self.entries.put(key, (time.monotonic(), value))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+quota_tracker = QuotaTracker()
+search_cache = SearchCache()
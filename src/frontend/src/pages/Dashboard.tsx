@@ -36,6 +36,9 @@ const Dashboard = () => {
         // Create form data for the request
         const formData = new FormData();
         formData.append('user_id', userId);
+        // Notes come back newest first, so the first page of 3 is all we need
+        formData.append('limit', '3');
+        formData.append('include_summary', 'true');
         
         const response = await fetch('/api/get-all-notes', {
           method: 'POST',
@@ -31,37 +31,48 @@ const Notes = () => {
   const [searchQuery, setSearchQuery] = useState("");
   const [sortMethod, setSortMethod] = useState("recent");
   const [materials, setMaterials] = useState<Material[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
-  useEffect(() => {
-    const fetchMaterials = async () => {
-      try {
-        setIsLoading(true);
+  // Fetches one page of notes, newest first, and appends it to the list
+  const fetchMaterials = async (cursor: string | null) => {
+    const auth = getAuth();
+    const user = auth.currentUser;
 
-        const auth = getAuth();
-        const user = auth.currentUser;
+    if (!user) {
+      setError("You must be logged in to view notes.");
+      return;
+    }
 
-        if (!user) {
-          setError("You must be logged in to view notes.");
-          setIsLoading(false);
-          return;
-        }
+    // Notes are searched by summary on this page, so ask for it
+    const formData = new FormData();
+    formData.append("user_id", user.uid);
+    formData.append("include_summary", "true");
+    if (cursor) {
+      formData.append("cursor", cursor);
+    }
 
-        const formData = new FormData();
-        formData.append("user_id", user.uid);
+    const response = await fetch("http://localhost:8000/get-all-notes", {
+      method: "POST",
+      body: formData,
+    });
 
-        const response = await fetch("http://localhost:8000/get-all-notes", {
-          method: "POST",
-          body: formData,
-        });
+    if (!response.ok) {
+      throw new Error(`Error: ${response.status}`);
+    }
 
-        if (!response.ok) {
-          throw new Error(`Error: ${response.status}`);
-        }
+    const data = await response.json();
+    setMaterials(previous => cursor ? [...previous, ...(data.materials || [])] : (data.materials || []));
+    setNextCursor(data.next_cursor);
+  };
 
-        const data = await response.json();
-        setMaterials(data.materials || []);
+  useEffect(() => {
+    const loadFirstPage = async () => {
+      try {
+        setIsLoading(true);
+        await fetchMaterials(null);
       } catch (err) {
         console.error("Failed to fetch materials:", err);
         setError("Failed to load notes. Please try again later.");
@@ -70,9 +81,21 @@ const Notes = () => {
       }
     };
 
-    fetchMaterials();
+    loadFirstPage();
   }, []);
 
+  const handleLoadMore = async () => {
+    try {
+      setIsLoadingMore(true);
+      await fetchMaterials(nextCursor);
+    } catch (err) {
+      console.error("Failed to fetch more materials:", err);
+      setError("Failed to load notes. Please try again later.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const filteredMaterials = useMemo(() => {
     return materials.filter(material =>
       (material.name?.toLowerCase() || '').includes(searchQuery.toLowerCase()) ||
@@ -209,6 +232,15 @@ const Notes = () => {
             </div>
           )}
         </motion.div>
+
+        {!isLoading && !error && nextCursor && (
+          <div className="flex justify-center mt-8">
+            <Button variant="outline" onClick={handleLoadMore} disabled={isLoadingMore}>
+              {isLoadingMore ? <Spinner className="h-4 w-4 mr-2" /> : null}
+              Load more
+            </Button>
+          </div>
+        )}
       </div>
     </AppShell>
   );
@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { getAuth } from "firebase/auth";
 import { AppShell } from "@/components/layout/AppShell";
 import { Button } from "@/components/ui/button";
@@ -9,6 +9,36 @@ import { FileIcon, PlusIcon, UploadIcon, XIcon } from "lucide-react";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { motion } from "framer-motion";
 
+const API_URL = "http://localhost:8000";
+const JOB_POLL_INTERVAL_MS = 2000;
+
+const STAGE_LABELS: Record<string, string> = {
+  video_summary: "Summarizing video",
+  ocr: "Reading pages",
+  embedding: "Indexing pages",
+  storing: "Saving notes",
+  summary: "Writing summary",
+  file_url: "Finishing up",
+};
+
+type IngestionJob = {
+  job_id: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  stage: string | null;
+  pages_total: number | null;
+  pages_done: number;
+  error: string | null;
+};
+
+const describeJob = (job: IngestionJob) => {
+  if (job.status === "queued") return "Queued for processing...";
+  if (job.status === "failed") return `Processing failed: ${job.error ?? "unknown error"}`;
+  if (job.status === "succeeded") return "Notes processed successfully!";
+  const stage = (job.stage && STAGE_LABELS[job.stage]) || "Processing";
+  const pages = job.pages_total ? ` (${job.pages_done}/${job.pages_total} pages)` : job.pages_done ? ` (${job.pages_done} pages)` : "";
+  return `${stage}${pages}...`;
+};
+
 const NotesUpload = () => {
   const [title, setTitle] = useState("");
   const [selectedCourse, setSelectedCourse] = useState<string | null>(null);
@@ -17,7 +47,34 @@ const NotesUpload = () => {
   const [videoUrl, setVideoUrl] = useState("");
   const [errors, setErrors] = useState<{ title?: string; course?: string; file?: string }>({});
   const [isUploading, setIsUploading] = useState(false);
-  const [uploadStatus, setUploadStatus] = useState<{ success: boolean; message: string } | null>(null);
+  const [uploadStatus, setUploadStatus] = useState<{ success: boolean; pending?: boolean; message: string } | null>(null);
+  const pollTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
+
+  useEffect(() => () => {
+    if (pollTimer.current) clearTimeout(pollTimer.current);
+  }, []);
+
+  // The upload endpoint only queues the file; follow the ingestion job until it succeeds or fails
+  const pollJob = async (jobId: string) => {
+    try {
+      const response = await fetch(`${API_URL}/ingestion-jobs/${jobId}`);
+      if (!response.ok) {
+        throw new Error(`Could not check processing status: ${response.statusText}`);
+      }
+      const job: IngestionJob = await response.json();
+      const finished = job.status === "succeeded" || job.status === "failed";
+      setUploadStatus({ success: job.status !== "failed", pending: !finished, message: describeJob(job) });
+      if (!finished) {
+        pollTimer.current = setTimeout(() => pollJob(jobId), JOB_POLL_INTERVAL_MS);
+      }
+    } catch (error) {
+      console.error("Status check error:", error);
+      setUploadStatus({
+        success: false,
+        message: error instanceof Error ? error.message : "An unknown error occurred"
+      });
+    }
+  };
 
   const courses = [
     { id: 1, name: "Introduction to Physics" },
@@ -71,7 +128,8 @@ const NotesUpload = () => {
 
     try {
       setIsUploading(true);
-      const response = await fetch("http://localhost:8000/upload-material/", {
+      if (pollTimer.current) clearTimeout(pollTimer.current);
+      const response = await fetch(`${API_URL}/upload-material/`, {
         method: "POST",
         body: formData,
       });
@@ -88,7 +146,8 @@ const NotesUpload = () => {
       setUploadedFile(null);
       setImagePreview(null);
       setVideoUrl("");
-      setUploadStatus({ success: true, message: "Notes uploaded successfully!" });
+      setUploadStatus({ success: true, pending: true, message: "Queued for processing..." });
+      pollJob(result.job_id);
 
     } catch (error) {
       console.error("Upload error:", error);
@@ -264,7 +323,7 @@ const NotesUpload = () => {
           </Button>
 
           {uploadStatus && (
-            <div className={`ml-4 ${uploadStatus.success ? 'text-green-500' : 'text-red-500'}`}>
+            <div className={`ml-4 ${uploadStatus.pending ? 'text-muted-foreground' : uploadStatus.success ? 'text-green-500' : 'text-red-500'}`}>
               {uploadStatus.message}
             </div>
           )}
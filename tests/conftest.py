@@ -0,0 +1,24 @@
+import os
+import tempfile
+import pytest
+
+# Set before any service module is imported: the shared engine and the model
+# column types are built from these at import time. SQLite has no array type,
+# so embeddings are stored as float32 bytes.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='athena-tests-'), 'athena.db')}"
+os.environ["EMBEDDING_STORAGE"] = "float32"
+# Some provider clients are constructed on import and refuse an empty key; tests never call them
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+# Tables the ingestion and backfill paths touch; questions uses a Postgres-only array column
+TEST_TABLES = ["users", "material_metadata", "materials", "video_metadata", "video_transcript", "ingestion_jobs"]
+
+
+@pytest.fixture
+def session_factory():
+    from src.backend.services.database import engine, SessionLocal
+    from src.backend.services.models import Base
+    tables = [Base.metadata.tables[name] for name in TEST_TABLES]
+    Base.metadata.create_all(engine, tables=tables)
+    yield SessionLocal
+    Base.metadata.drop_all(engine, tables=tables)
@@ -0,0 +1,91 @@
+import json
+import uuid
+import hashlib
+from types import SimpleNamespace
+import numpy as np
+
+
+def fake_embedding(text:str, dim:int) -> list[float]:
+    """Deterministic unit vector for a text, so repeated runs produce identical output"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class _Datasets:
+    def __init__(self, api):
+        self.api = api
+
+    def create(self, name:str, data, type:str, keep_fields:list[str]=None):
+        records = [json.loads(line) for line in data.read().decode("utf-8").splitlines() if line.strip()]
+        if any(not record.get("text") for record in records):
+            raise ValueError(f"Dataset {name} has records without text")
+        return SimpleNamespace(id=self.api._store_dataset(name, records, keep_fields or []))
+
+    def get(self, id:str):
+        return SimpleNamespace(dataset=self.api.datasets_by_id[id])
+
+
+class _EmbedJobs:
+    def __init__(self, api):
+        self.api = api
+
+    def create(self, dataset_id:str, model:str, input_type:str, embedding_types:list[str]=None, truncate:str=None):
+        dataset = self.api.datasets_by_id[dataset_id]
+        output = [
+            {**{field: record[field] for field in dataset.keep_fields if field in record},
+             "text": record["text"],
+             "embeddings": {"float": fake_embedding(record["text"], self.api.dim)}}
+            for record in dataset.records
+        ]
+        job_id = str(uuid.uuid4())
+        self.api.jobs[job_id] = SimpleNamespace(
+            job_id=job_id,
+            status="processing",
+            output_dataset_id=self.api._store_dataset(f"{dataset.name}-output", output, []),
+            # Report processing for a couple of polls so callers exercise their wait loop
+            polls_left=2,
+        )
+        return SimpleNamespace(job_id=job_id)
+
+    def get(self, job_id:str):
+        job = self.api.jobs[job_id]
+        if job.status == "processing":
+            job.polls_left -= 1
+            if job.polls_left <= 0:
+                job.status = "complete"
+        return job
+
+
+class _Utils:
+    def dataset_generator(self, dataset):
+        yield from dataset.records
+
+
+class LocalCohereClient:
+    """
+    In-process stand-in for the dataset and embed-job endpoints of cohere.Client.
+
+    Tests pass it as Cohere(api_key, client=LocalCohereClient()) to run the
+    backfill without network access or API spend. Embeddings are deterministic
+    hashes of the text, not real model output.
+    """
+    def __init__(self, dim:int=1024):
+        self.dim = dim
+        self.datasets_by_id = {}
+        self.jobs = {}
+        self.datasets = _Datasets(self)
+        self.embed_jobs = _EmbedJobs(self)
+        self.utils = _Utils()
+
+    def _store_dataset(self, name:str, records:list[dict], keep_fields:list[str]) -> str:
+        dataset_id = f"{name}-{uuid.uuid4().hex[:8]}"
+        self.datasets_by_id[dataset_id] = SimpleNamespace(
+            id=dataset_id,
+            name=name,
+            records=records,
+            keep_fields=keep_fields,
+            validation_status="validated",
+            validation_error=None,
+        )
+        return dataset_id
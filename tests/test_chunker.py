@@ -0,0 +1,30 @@
+import random
+import pytest
+from src.backend.services.chunker import PAGE_SEPARATOR, iter_chunks
+from src.backend.services.material_ingest import join_chunks
+from src.backend.services.pydantic_models import OCRPage
+
+PIECES = ["mitochondria", "ATP", "the", "Krebs", "cycle", "x", "électron", "1.5", "(NADH)", ".", ",", "!", "—", "#", "|"]
+SPACES = [" ", " ", " ", "  ", "\n", "\n\n", "\t", " \n "]
+
+
+def random_page(rng:random.Random) -> str:
+    if rng.random() < 0.1:
+        return rng.choice(["", " ", "\n\n"])
+    words = [rng.choice(PIECES) + (rng.choice(SPACES) if rng.random() < 0.8 else "") for _ in range(rng.randrange(1, 120))]
+    return rng.choice(["", " ", "\n"]) + "".join(words) + rng.choice(["", " ", "\n\n"])
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_chunks_join_back_into_the_document(seed):
+    rng = random.Random(seed)
+    markdowns = [random_page(rng) for _ in range(rng.randrange(1, 6))]
+    if not "".join(markdowns).strip():
+        markdowns.append("lecture")
+    max_tokens = rng.randrange(2, 60)
+    overlap = rng.randrange(0, max_tokens)
+
+    chunks = list(iter_chunks((OCRPage(index=i, markdown=markdown) for i, markdown in enumerate(markdowns)), max_tokens, overlap))
+
+    assert join_chunks(chunks) == PAGE_SEPARATOR.join(markdowns)
+    assert all(chunk.token_count <= max_tokens for chunk in chunks)
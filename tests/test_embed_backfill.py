@@ -0,0 +1,108 @@
+import os
+import json
+import numpy as np
+import pytest
+from src.backend.services.cohere_client import Cohere, EMBED_MODEL
+from src.backend.services.embed_backfill import EmbedBackfill, BackfillState
+from src.backend.services.embedding_cache import EmbeddingCache
+from src.backend.services.models import Material, Material_Metadata, Users
+from tests.local_cohere import LocalCohereClient, fake_embedding
+
+DIM = 8
+ROWS = 7
+BATCH_ROWS = 3
+
+
+@pytest.fixture
+def material_ids(session_factory) -> list[int]:
+    db = session_factory()
+    try:
+        db.add(Users(id="student"))
+        metadata = Material_Metadata(name="lecture", user_id="student")
+        db.add(metadata)
+        db.flush()
+        materials = [
+            # Empty rows keep their current vector: embed jobs reject empty inputs
+            Material(doc_id=metadata.id, chunk_id=i, text="" if i == 4 else f"chunk {i} of the lecture", embedding=[0.0] * DIM)
+            for i in range(ROWS)
+        ]
+        db.add_all(materials)
+        db.commit()
+        return [material.id for material in materials]
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client() -> LocalCohereClient:
+    return LocalCohereClient(dim=DIM)
+
+
+def make_backfill(client:LocalCohereClient, session_factory, tmp_path) -> EmbedBackfill:
+    co_client = Cohere("test", cache=EmbeddingCache(path=str(tmp_path / "embeddings.db")), client=client)
+    return EmbedBackfill(co_client, session_factory, batch_rows=BATCH_ROWS, poll_interval=0, state_dir=str(tmp_path / "backfill"))
+
+
+def stored_embeddings(session_factory) -> dict[int, tuple[str, np.ndarray]]:
+    db = session_factory()
+    try:
+        return {row.id: (row.text, np.asarray(row.embedding)) for row in db.query(Material).all()}
+    finally:
+        db.close()
+
+
+def assert_embedded(session_factory, ids:list[int]):
+    stored = stored_embeddings(session_factory)
+    for row_id in ids:
+        text, embedding = stored[row_id]
+        expected = fake_embedding(text, DIM) if text else [0.0] * DIM
+        assert np.allclose(embedding, expected, atol=1e-6), f"row {row_id} was not re-embedded"
+
+
+def test_backfill_reembeds_every_row(session_factory, material_ids, client, tmp_path):
+    backfill = make_backfill(client, session_factory, tmp_path)
+
+    assert backfill.run("materials") == ROWS
+
+    assert_embedded(session_factory, material_ids)
+    state = BackfillState(os.path.join(backfill.state_dir, f"materials-{backfill.model}.json"))
+    assert state.after_id == material_ids[-1]
+    assert state.batch is None
+    assert not [name for name in os.listdir(backfill.state_dir) if name.endswith(".jsonl")]
+    # A finished backfill has nothing left to do
+    assert backfill.run("materials") == ROWS
+    assert len(client.jobs) == -(-ROWS // BATCH_ROWS)
+
+
+def test_backfill_resumes_the_batch_in_flight(session_factory, material_ids, client, tmp_path, monkeypatch):
+    get_job = client.embed_jobs.get
+
+    def lose_connection_on_second_job(job_id:str):
+        if len(client.jobs) == 2:
+            monkeypatch.undo()
+            raise ConnectionError("lost connection to Cohere")
+        return get_job(job_id)
+
+    monkeypatch.setattr(client.embed_jobs, "get", lose_connection_on_second_job)
+    with pytest.raises(ConnectionError):
+        make_backfill(client, session_factory, tmp_path).run("materials")
+
+    # The first batch is committed; the second is recorded with its submitted job
+    backfill = make_backfill(client, session_factory, tmp_path)
+    with open(os.path.join(backfill.state_dir, f"materials-{backfill.model}.json"), encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["after_id"] == material_ids[BATCH_ROWS - 1]
+    assert state["batch"]["job_id"] in client.jobs
+    assert_embedded(session_factory, material_ids[:BATCH_ROWS])
+
+    assert backfill.run("materials") == ROWS
+
+    assert_embedded(session_factory, material_ids)
+    # The interrupted batch reused its embed job instead of submitting a new one
+    assert len(client.jobs) == -(-ROWS // BATCH_ROWS)
+
+
+def test_backfill_refuses_a_model_queries_do_not_use(client, session_factory, tmp_path):
+    co_client = Cohere("test", cache=EmbeddingCache(path=str(tmp_path / "embeddings.db")), client=client)
+    with pytest.raises(ValueError, match=EMBED_MODEL):
+        EmbedBackfill(co_client, session_factory, model="embed-multilingual-v3.0", state_dir=str(tmp_path / "backfill"))
@@ -0,0 +1,156 @@
+import io
+import os
+import asyncio
+import pytest
+from src.backend.services import ingestion
+from src.backend.services.chunker import iter_chunks
+from src.backend.services.ingestion import IngestionQueue, IngestionWorker, create_job, save_upload
+from src.backend.services.models import Ingestion_Job, Material, Material_Metadata, Users
+from src.backend.services.pydantic_models import LLMResponse, OCRPage
+
+PAGES = [
+    OCRPage(index=0, markdown="Mitochondria produce ATP through oxidative phosphorylation. " * 40),
+    OCRPage(index=1, markdown="The Krebs cycle runs in the mitochondrial matrix. " * 40),
+]
+
+
+class StubGemini:
+    def summarize_video(self, video_url:str, mime_type:str) -> str:
+        return f"summary of {video_url}"
+
+    def generate_summary(self, text:str) -> LLMResponse:
+        return LLMResponse(text=f"summary of {len(text)} characters")
+
+
+class StubCohere:
+    def embed_batch(self, texts:list[str], input_type:str="search_document") -> list[list[float]]:
+        return [[float(len(text)), float(i), 1.0, 0.0] for i, text in enumerate(texts)]
+
+
+async def get_signed_url(filename:str) -> str:
+    return f"https://storage.example.com/{os.path.basename(filename)}"
+
+
+def fake_ocr(file_path:str):
+    if file_path.endswith(".broken"):
+        raise ValueError("OCR failed")
+    yield from PAGES
+
+
+@pytest.fixture
+def worker(session_factory, monkeypatch, tmp_path):
+    monkeypatch.setattr(ingestion, "INGESTION_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(ingestion, "iter_pages_from_file", fake_ocr)
+    db = session_factory()
+    try:
+        db.add(Users(id="student"))
+        db.commit()
+    finally:
+        db.close()
+    return IngestionWorker(session_factory, StubGemini(), StubCohere(), get_signed_url)
+
+
+def queue_job(session_factory, filename:str) -> tuple[str, str]:
+    file_path = save_upload(io.BytesIO(b"%PDF-1.4 stub"), filename)
+    db = session_factory()
+    try:
+        return create_job(db, "student", filename, file_path).id, file_path
+    finally:
+        db.close()
+
+
+async def drain(queue:IngestionQueue):
+    # start() recovers every job already queued in the database in the background
+    await queue.start()
+    await queue.recovery
+    await queue.queue.join()
+    await queue.stop()
+
+
+def test_queue_runs_job_and_stores_chunks(session_factory, worker):
+    job_id, file_path = queue_job(session_factory, "notes.pdf")
+
+    asyncio.run(drain(IngestionQueue(worker, concurrency=1)))
+
+    expected = list(iter_chunks(PAGES))
+    db = session_factory()
+    try:
+        job = db.get(Ingestion_Job, job_id)
+        assert job.status == "succeeded"
+        assert job.error is None
+        metadata = db.get(Material_Metadata, job.doc_id)
+        assert metadata.summary.startswith("summary of")
+        assert metadata.file_url.startswith("https://storage.example.com/")
+        materials = db.query(Material).filter(Material.doc_id == job.doc_id).order_by(Material.chunk_id).all()
+        assert [material.text for material in materials] == [chunk.text for chunk in expected]
+        assert (materials[0].page_start, materials[-1].page_end) == (0, 1)
+        assert list(materials[0].embedding) == StubCohere().embed_batch([expected[0].text])[0]
+    finally:
+        db.close()
+    assert not os.path.exists(file_path)
+
+
+def test_failed_job_does_not_stop_the_queue(session_factory, worker):
+    broken_id, broken_path = queue_job(session_factory, "scan.broken")
+    job_id, _ = queue_job(session_factory, "notes.pdf")
+
+    # One consumer, so the second job only runs if the first failure left it alive
+    asyncio.run(drain(IngestionQueue(worker, concurrency=1)))
+
+    db = session_factory()
+    try:
+        broken = db.get(Ingestion_Job, broken_id)
+        assert broken.status == "failed"
+        assert "OCR failed" in broken.error
+        assert db.get(Ingestion_Job, job_id).status == "succeeded"
+    finally:
+        db.close()
+    assert not os.path.exists(broken_path)
+
+
+def test_consumer_survives_errors_outside_the_job(session_factory, worker, monkeypatch):
+    crashing_id, _ = queue_job(session_factory, "first.pdf")
+    job_id, _ = queue_job(session_factory, "second.pdf")
+    claim = worker._claim
+
+    def flaky_claim(claimed_id:str):
+        if claimed_id == crashing_id:
+            raise RuntimeError("database unavailable")
+        return claim(claimed_id)
+
+    monkeypatch.setattr(worker, "_claim", flaky_claim)
+    asyncio.run(drain(IngestionQueue(worker, concurrency=1)))
+
+    db = session_factory()
+    try:
+        crashing = db.get(Ingestion_Job, crashing_id)
+        assert crashing.status == "failed"
+        assert crashing.error == "database unavailable"
+        assert db.get(Ingestion_Job, job_id).status == "succeeded"
+    finally:
+        db.close()
+
+
+def test_recovery_errors_do_not_stop_the_queue(session_factory, worker, monkeypatch):
+    def database_unavailable():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(worker, "requeue_stale", database_unavailable)
+    job_id, _ = queue_job(session_factory, "notes.pdf")
+
+    async def submit_after_failed_recovery():
+        queue = IngestionQueue(worker, concurrency=1)
+        await queue.start()
+        await queue.recovery
+        # Nothing was recovered, but the consumers still take new submissions
+        await queue.submit(job_id)
+        await queue.queue.join()
+        await queue.stop()
+
+    asyncio.run(submit_after_failed_recovery())
+
+    db = session_factory()
+    try:
+        assert db.get(Ingestion_Job, job_id).status == "succeeded"
+    finally:
+        db.close()
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from src.backend.services.models import Material_Metadata, Users
+from src.backend.services.pagination import keyset_page
+
+
+def test_pages_cover_rows_without_created_at(session_factory):
+    db = session_factory()
+    try:
+        db.add(Users(id="student"))
+        started = datetime(2024, 9, 1)
+        notes = [Material_Metadata(name=f"lecture {i}", user_id="student", created_at=started + timedelta(days=i)) for i in range(5)]
+        db.add_all(notes)
+        db.flush()
+        # Rows from before created_at had a default
+        legacy = [Material_Metadata(name=f"legacy {i}", user_id="student") for i in range(3)]
+        db.add_all(legacy)
+        db.flush()
+        for note in legacy:
+            note.created_at = None
+        db.commit()
+
+        columns = [Material_Metadata.id, Material_Metadata.name]
+        filters = [Material_Metadata.user_id == "student"]
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(db, Material_Metadata, columns, filters, cursor, limit=2)
+            seen += [row["id"] for row in page]
+            if cursor is None:
+                break
+
+        newest_first = [note.id for note in sorted(legacy, key=lambda note: -note.id)] + [note.id for note in reversed(notes)]
+        assert seen == newest_first
+    finally:
+        db.close()
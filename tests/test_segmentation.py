@@ -0,0 +1,16 @@
+from types import SimpleNamespace
+from src.backend.services.segmentation import detect_sentence_boundaries
+
+
+def snippets(*timed_texts:tuple[float, float, str]) -> list[SimpleNamespace]:
+    return [SimpleNamespace(start=start, duration=duration, text=text) for start, duration, text in timed_texts]
+
+
+def test_lowercase_continuation_only_applies_to_punctuated_transcripts():
+    # Medium pause before a lowercase word: a continuation when the captions are punctuated
+    punctuated = snippets((0.0, 2.0, "Today we cover the Krebs cycle."), (2.0, 2.0, "It starts with acetyl CoA"), (4.5, 2.0, "which enters the matrix."))
+    assert detect_sentence_boundaries(punctuated) == [True, False, True]
+
+    # Auto-generated captions are all lowercase, so only the pauses decide
+    unpunctuated = snippets((0.0, 2.0, "today we cover the krebs cycle"), (2.5, 2.0, "it starts with acetyl coa"), (4.55, 2.0, "which enters the matrix"))
+    assert detect_sentence_boundaries(unpunctuated) == [True, False, True]
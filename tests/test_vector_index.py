@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from src.backend.services.vector_index import VectorIndex
+
+DIM = 16
+
+
+def test_rows_added_while_training_survive_the_swap():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((400, DIM), dtype=np.float32)
+    # nprobe covers every list, so search is exact
+    index = VectorIndex(DIM, nprobe=400, train_threshold=10**9)
+    index.add(list(range(300)), vectors[:300])
+
+    # Train the way add() does, with rows arriving between the snapshot and the swap
+    index._training = True
+    snapshot = [inverted_list.view() for inverted_list in index.lists]
+    index.add(list(range(300, 400)), vectors[300:])
+    index._train(snapshot)
+
+    assert index.is_trained
+    assert len(index) == 400
+    assert index.trained_size == 300
+    for row_id in (0, 299, 300, 399):
+        assert index.search(vectors[row_id], k=1)[0][0] == row_id
+
+
+def test_search_rejects_k_below_one():
+    index = VectorIndex(DIM)
+    index.add([1], np.ones((1, DIM), dtype=np.float32))
+    with pytest.raises(ValueError):
+        index.search(np.ones(DIM), k=0)